@@ -0,0 +1,133 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from notebooks import data_catalog, model_registry
+from notebooks.pipeline_timing import instrument, timings
+from notebooks.sentiment import set_store
+
+# Colunas da tabela de entrada copiadas para a saída, para juntar as previsões de volta às reviews
+KEY_COLUMNS = ['review_id', 'order_id', 'review_creation_date']
+
+# Modelo carregado uma vez em cada worker (com memory map, as páginas dos arrays são compartilhadas)
+_worker_model = None
+
+def _init_worker(model_name : str, timed : bool=False):
+    global _worker_model
+    # Reviews já pontuadas pelo LeIA em outro lote, treino ou execução saem da loja de sentimentos
+    _worker_model = set_store(model_registry.load_model(model_name))
+    if timed:
+        instrument(_worker_model)
+
+def score_texts(model, texts) -> tuple:
+    """
+    Aplica o pipeline a uma lista de textos.
+
+    Returns:
+        (classes previstas, matriz de probabilidades float32 na ordem de model.classes_)
+    """
+    texts = ['' if text is None else text for text in texts]
+    proba = model.predict_proba(texts).astype(np.float32)
+    return model.classes_[proba.argmax(axis=1)], proba
+
+def _score_batch(texts) -> tuple:
+    # Os tempos por etapa do worker voltam junto com o lote e são somados no processo principal
+    return (*score_texts(_worker_model, texts), timings.snapshot(reset=True))
+
+def _output_batch(batch : pa.RecordBatch, keys : list, classes, predictions, proba) -> pa.Table:
+    table = pa.Table.from_batches([batch]).select(keys)
+    table = table.append_column('predicted_score', pa.array(predictions))
+    for i, label in enumerate(classes):
+        table = table.append_column(f'proba_{label}', pa.array(proba[:, i]))
+    return table
+
+def score_file(input_path, output_path, column : str='review_comment_message', model_name : str='satisfaction_rf',
+        batch_size : int=5_000, n_jobs : int=None, timings_path=None, verbose : bool=False) -> dict:
+    """
+    Pontua um parquet de reviews em lotes, usando vários processos, e grava as previsões em output_path.
+
+    A saída tem as colunas de KEY_COLUMNS presentes na entrada, predicted_score e uma coluna
+    proba_<nota> por classe do modelo. Com timings_path, grava também os histogramas de tempo
+    de cada etapa do pipeline (ver pipeline_timing).
+
+    Returns:
+        Um dicionário com linhas, segundos e linhas por segundo.
+    """
+    start = time.perf_counter()
+    # Carrega no processo principal primeiro: gera a cópia rápida do modelo antes de os workers abrirem
+    classes = model_registry.load_model(model_name).classes_
+    source_file = pq.ParquetFile(input_path)
+    keys = [col for col in KEY_COLUMNS if col in source_file.schema_arrow.names]
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix('.parquet.tmp')
+    n_jobs = n_jobs or os.cpu_count()
+    writer, rows = None, 0
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(model_name, timings_path is not None)) as executor:
+        pending = deque()
+
+        def write(batch, future):
+            nonlocal writer
+            predictions, proba, worker_timings = future.result()
+            timings.merge(worker_timings)
+            table = _output_batch(batch, keys, classes, predictions, proba)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+            return batch.num_rows
+
+        try:
+            # Mantém poucos lotes em voo e escreve na mesma ordem da entrada
+            for batch in source_file.iter_batches(batch_size=batch_size, columns=keys + [column]):
+                pending.append((batch, executor.submit(_score_batch, batch.column(column).to_pylist())))
+                if len(pending) >= 2 * n_jobs:
+                    rows += write(*pending.popleft())
+            while pending:
+                rows += write(*pending.popleft())
+        finally:
+            if writer is not None:
+                writer.close()
+
+    if writer is None:
+        return {'Linhas': 0, 'Segundos': 0.0, 'Linhas/s': 0.0}
+    os.replace(tmp_path, output_path)
+    if timings_path is not None:
+        timings.export(timings_path)
+
+    elapsed = time.perf_counter() - start
+    stats = {'Linhas': rows, 'Segundos': round(elapsed, 2), 'Linhas/s': round(rows / max(elapsed, 1e-9), 1)}
+    if verbose:
+        print(f'{input_path} -> {output_path}: {rows} reviews em {elapsed:.2f}s ({stats["Linhas/s"]:.0f} linhas/s)')
+    return stats
+
+def score_table(source : str='order_reviews', output : str='review_predictions', **kwargs) -> dict:
+    # Mesmo que score_file, usando nomes do catálogo
+    return score_file(data_catalog.table_path(source), data_catalog.table_path(output), **kwargs)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pontua reviews em lote com o modelo de satisfação.')
+    parser.add_argument('input', nargs='?', default=None, help='Parquet de entrada (padrão: tabela order_reviews do catálogo).')
+    parser.add_argument('output', nargs='?', default=None, help='Parquet de saída (padrão: tabela review_predictions do catálogo).')
+    parser.add_argument('--column', default='review_comment_message')
+    parser.add_argument('--model', default='satisfaction_rf')
+    parser.add_argument('--batch-size', type=int, default=5_000)
+    parser.add_argument('--jobs', type=int, default=None, help='Número de processos (padrão: todos os núcleos).')
+    parser.add_argument('--timings', default=None, help='Arquivo JSON para os histogramas de tempo por etapa.')
+    args = parser.parse_args()
+
+    score_file(args.input or data_catalog.table_path('order_reviews'), args.output or data_catalog.table_path('review_predictions'),
+               column=args.column, model_name=args.model, batch_size=args.batch_size, n_jobs=args.jobs, timings_path=args.timings, verbose=True)
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.batch_scoring
+# python -m notebooks.batch_scoring data/reviews_2018-08-30.parquet data/outputs/predictions_2018-08-30.parquet --jobs 4
+# score_table()
@@ -1,85 +1,338 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
 from math import ceil
 from sklearn.cluster import KMeans
 from sklearn.discriminant_analysis import StandardScaler
-from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bouldin_score
+from scipy.stats import norm
+from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score
 from sklearn.preprocessing import MinMaxScaler
-from yellowbrick.cluster import KElbowVisualizer, SilhouetteVisualizer
+from threadpoolctl import threadpool_limits
+from yellowbrick.utils import KneeLocator
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-def cluster_scores(df_cluster : pd.DataFrame, initial_range : int, final_range : int, random:int=42, 
-    score_types:list=["silhouette"], width_per_ax : int=5, height_per_ax : int=5): 
-    
-    km = KMeans(random_state=random)
-    visualizer = KElbowVisualizer(km, k=(initial_range, final_range))
-    visualizer.fit(df_cluster)
-    visualizer.show()
-
-    fitted_kmeans = {}
-    labels_kmeans = {}
-    df_scores = []
-    for n_clusters in np.arange(initial_range, final_range):
-        tmp_scores = {}
-        tmp_scores["n_clusters"] = n_clusters
-        
-        kmeans = KMeans(n_clusters=n_clusters, random_state=random)
-        labels_clusters = kmeans.fit_predict(df_cluster)
-        
-        fitted_kmeans[n_clusters] = kmeans
-        labels_kmeans[n_clusters] = labels_clusters
-        
+SCORE_TYPES = ["silhouette", "calinski_harabasz", "davies_bouldin"]
+
+def _silhouette_rows(X : np.ndarray, labels : np.ndarray, rows : np.ndarray, max_memory_mb : int=512) -> np.ndarray:
+    # Silhueta exata das linhas em rows contra todas as linhas de X. As distâncias são calculadas
+    # em blocos de linhas que cabem em max_memory_mb, nunca a matriz n x n inteira.
+    _, labels = np.unique(labels, return_inverse=True)
+    order = np.argsort(labels, kind="stable")
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order))
+    X_sorted = X[order]
+    counts = np.bincount(labels)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    sq_norms = np.einsum("ij,ij->i", X_sorted, X_sorted)
+
+    # Bloco de distâncias mais uma cópia temporária
+    chunk = max(1, int(max_memory_mb * 2**20 // (2 * X.shape[0] * X.dtype.itemsize)))
+    silhouette = np.empty(len(rows), dtype=np.float64)
+    for start in range(0, len(rows), chunk):
+        rows_chunk = rows[start:start + chunk]
+        X_chunk = X[rows_chunk]
+        distances = X_chunk @ X_sorted.T
+        distances *= -2
+        distances += sq_norms
+        distances += np.einsum("ij,ij->i", X_chunk, X_chunk)[:, None]
+        np.maximum(distances, 0, out=distances)
+        np.sqrt(distances, out=distances)
+
+        # Soma das distâncias de cada linha até cada cluster, sem o arredondamento da distância até ela mesma
+        index = np.arange(len(rows_chunk))
+        distances[index, position[rows_chunk]] = 0
+        sums = np.add.reduceat(distances, starts, axis=1, dtype=np.float64)
+        own = labels[rows_chunk]
+
+        own_counts = counts[own]
+        a = sums[index, own] / np.maximum(own_counts - 1, 1)
+        means = sums / counts
+        means[index, own] = np.inf
+        b = means.min(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = (b - a) / np.maximum(a, b)
+        # Mesmo critério do sklearn: silhueta 0 em clusters de um elemento
+        values[(own_counts == 1) | ~np.isfinite(values)] = 0
+        silhouette[start:start + len(rows_chunk)] = values
+    return silhouette
+
+def chunked_silhouette_samples(X, labels, max_memory_mb : int=512) -> np.ndarray:
+    """
+    Silhueta exata de cada amostra (igual ao sklearn.metrics.silhouette_samples), com uso de memória
+    limitado a max_memory_mb. O tempo continua O(n²), mas a memória fica O(n).
+    """
+    X = np.asarray(X)
+    X = X if X.dtype in (np.float32, np.float64) else X.astype(np.float64)
+    return _silhouette_rows(X, np.asarray(labels), np.arange(X.shape[0]), max_memory_mb=max_memory_mb)
+
+def sampled_silhouette(X, labels, n_samples : int=5_000, confidence : float=0.95, random : int=42,
+        max_memory_mb : int=512) -> dict:
+    """
+    Estimativa da silhueta média: silhueta exata de n_samples linhas sorteadas, cada uma comparada com
+    todas as linhas de X (custo n_samples x n). A média da amostra é um estimador sem viés do
+    silhouette_score, e o intervalo de confiança usa a aproximação normal.
+
+    Returns:
+        Dicionário com score, low, high, std_error, rows (linhas sorteadas) e samples (silhueta de cada uma).
+    """
+    X = np.asarray(X)
+    X = X if X.dtype in (np.float32, np.float64) else X.astype(np.float64)
+    n = X.shape[0]
+    rows = np.sort(np.random.default_rng(random).choice(n, size=min(n_samples, n), replace=False))
+    samples = _silhouette_rows(X, np.asarray(labels), rows, max_memory_mb=max_memory_mb)
+
+    # Correção de população finita: com a amostra do tamanho de X, o erro é zero
+    fpc = np.sqrt((n - len(rows)) / (n - 1)) if n > 1 else 0.0
+    std_error = samples.std(ddof=1) / np.sqrt(len(rows)) * fpc if len(rows) > 1 else 0.0
+    margin = norm.ppf(0.5 + confidence / 2) * std_error
+    score = float(samples.mean())
+    return {"score": score, "low": float(score - margin), "high": float(score + margin), "std_error": float(std_error),
+            "rows": rows, "samples": samples}
+
+class KMeansSweep:
+    """
+    Um KMeans ajustado por k sobre os mesmos dados, com inércia, rótulos, centróides, silhueta de cada
+    amostra, scores e tempo de ajuste. Os gráficos de cotovelo, silhueta e scores são todos desenhados
+    a partir daqui, sem ajustar o KMeans de novo.
+    """
+    def __init__(self, results : dict, wall_time : float=None):
+        self.results = results
+        self.wall_time = wall_time
+
+    @property
+    def ks(self) -> list:
+        return sorted(self.results)
+
+    def __getitem__(self, k : int) -> dict:
+        return self.results[k]
+
+    def __repr__(self) -> str:
+        n_samples = len(next(iter(self.results.values()))["labels"]) if self.results else 0
+        return f"KMeansSweep(ks={self.ks}, n_samples={n_samples})"
+
+    def scores(self, score_types : list=SCORE_TYPES, ks : list=None) -> pd.DataFrame:
+        df_scores = pd.DataFrame([{"n_clusters": k, "inertia": self.results[k]["inertia"], "fit_time": self.results[k]["fit_time"],
+                                   **{score: self.results[k][score] for score in score_types}} for k in ks or self.ks])
+        return df_scores.set_index("n_clusters")
+
+    def timings(self, ks : list=None) -> pd.DataFrame:
+        # Tempo de cada k: ajuste do KMeans, silhueta e total (com Calinski Harabasz e Davies Bouldin)
+        return pd.DataFrame([{"n_clusters": k, **{name: self.results[k][name] for name in ("fit_time", "silhouette_time", "time")}}
+                             for k in ks or self.ks]).set_index("n_clusters")
+
+    def elbow(self, ks : list=None):
+        # Mesmo critério do KElbowVisualizer (inércia = distortion score)
+        ks = ks or self.ks
+        inertia = [self.results[k]["inertia"] for k in ks]
+        if len(ks) < 3:
+            return None
+        return KneeLocator(ks, inertia, curve_nature="convex", curve_direction="decreasing").knee
+
+    def plot_elbow(self, ks : list=None, ax=None, timings : bool=True):
+        ks = ks or self.ks
+        ax = ax or plt.gca()
+        inertia = [self.results[k]["inertia"] for k in ks]
+        ax.plot(ks, inertia, marker="D", color="tab:blue")
+        ax.set_xlabel("k")
+        ax.set_ylabel("distortion score")
+
+        knee = self.elbow(ks)
+        if knee is not None:
+            ax.axvline(knee, color="k", linestyle="--", label=f"elbow at k = {knee}, score = {self.results[knee]['inertia']:.3f}")
+            ax.legend(loc="best", frameon=True)
+
+        if timings:
+            ax_time = ax.twinx()
+            ax_time.plot(ks, [self.results[k]["fit_time"] for k in ks], marker="o", linestyle="--", color="tab:green", alpha=0.75)
+            ax_time.set_ylabel("fit time (seconds)", color="tab:green")
+            ax_time.tick_params("y", colors="tab:green")
+            ax_time.grid(False)
+
+        ax.set_title("Distortion Score Elbow for KMeans Clustering")
+        return ax
+
+    def plot_silhouette(self, k : int, ax=None, title : str="clusters"):
+        ax = ax or plt.gca()
+        values, labels = self.results[k]["silhouette_samples"], self.results[k]["labels"]
+        if self.results[k]["silhouette_rows"] is not None:
+            labels = labels[self.results[k]["silhouette_rows"]]
+        colors = plt.cm.tab10(np.arange(k) % 10)
+
+        y_lower = 10
+        for cluster in range(k):
+            cluster_values = np.sort(values[labels == cluster])
+            y_upper = y_lower + len(cluster_values)
+            ax.fill_betweenx(np.arange(y_lower, y_upper), 0, cluster_values, facecolor=colors[cluster], edgecolor=colors[cluster], alpha=0.5)
+            ax.text(-0.05, y_lower + 0.5 * len(cluster_values), str(cluster))
+            y_lower = y_upper + 10
+
+        ax.axvline(self.results[k]["silhouette"], color="red", linestyle="--")
+        ax.set_xlim([min(-0.1, values.min()), 1])
+        ax.set_ylim([0, y_lower])
+        ax.set_yticks([])
+        ax.set_xlabel("silhouette coefficient values")
+        ax.set_ylabel("cluster label")
+        ax.set_title(f"{title} = {k}\nscore = {self.results[k]['silhouette']}")
+        return ax
+
+    def plot_scores(self, score_types : list=SCORE_TYPES, ks : list=None, width_per_ax : int=5, height_per_ax : int=5):
+        ks = ks or self.ks
+        axes = self.scores(score_types, ks)[score_types].plot(subplots=True, layout=(1, len(score_types)),
+            figsize=(len(score_types) * width_per_ax, height_per_ax), xticks=ks)
+
+        # Intervalo de confiança quando a silhueta foi estimada por amostragem
         if "silhouette" in score_types:
-            silhouette = silhouette_score(df_cluster, labels_clusters)
-            tmp_scores["silhouette"] = silhouette
-        
-        if "calinski_harabasz" in score_types:
-            ch = calinski_harabasz_score(df_cluster, labels_clusters)
-            tmp_scores["calinski_harabasz"] = ch
-        
-        if "davies_bouldin" in score_types:
-            db = davies_bouldin_score(df_cluster, labels_clusters)
-            tmp_scores["davies_bouldin"] = db
-                    
-        df_scores.append(tmp_scores)
-
-    df_scores = pd.DataFrame(df_scores)
-    df_scores.set_index("n_clusters", inplace=True)
-    df_scores.plot(subplots=True, layout=(1,len(score_types)), figsize=(len(score_types) * width_per_ax, height_per_ax), xticks=np.arange(initial_range, final_range+1))
-
-    return
+            ax = axes.ravel()[score_types.index("silhouette")]
+            ax.fill_between(ks, [self.results[k]["silhouette_low"] for k in ks], [self.results[k]["silhouette_high"] for k in ks],
+                alpha=0.2, color=ax.get_lines()[0].get_color())
+        return axes
+
+def _fit_k(X : np.ndarray, n_clusters : int, random : int=42, silhouette_sample : int=None, max_memory_mb : int=512,
+        threads : int=None) -> dict:
+    with threadpool_limits(limits=threads):
+        start = time.perf_counter()
+        kmeans = KMeans(n_clusters=n_clusters, random_state=random)
+        labels = kmeans.fit_predict(X)
+        fit_time = time.perf_counter() - start
+
+        if silhouette_sample and silhouette_sample < X.shape[0]:
+            estimate = sampled_silhouette(X, labels, n_samples=silhouette_sample, random=random, max_memory_mb=max_memory_mb)
+            rows, silhouette = estimate["rows"], estimate["samples"]
+            low, high = estimate["low"], estimate["high"]
+        else:
+            rows, silhouette = None, chunked_silhouette_samples(X, labels, max_memory_mb=max_memory_mb)
+            low = high = float(silhouette.mean())
+        silhouette_time = time.perf_counter() - start - fit_time
+
+        return {
+            "inertia": kmeans.inertia_,
+            "labels": labels.astype(np.int32),
+            "centers": kmeans.cluster_centers_,
+            "silhouette_samples": silhouette.astype(np.float32),
+            "silhouette_rows": rows,
+            "silhouette": float(silhouette.mean()),
+            "silhouette_low": low,
+            "silhouette_high": high,
+            "calinski_harabasz": calinski_harabasz_score(X, labels),
+            "davies_bouldin": davies_bouldin_score(X, labels),
+            "fit_time": fit_time,
+            "silhouette_time": silhouette_time,
+            "time": time.perf_counter() - start,
+        }
+
+# Dados do sweep em cada worker, enviados uma vez por processo (e não uma vez por k)
+_worker_X = None
+
+def _init_sweep_worker(X : np.ndarray):
+    global _worker_X
+    _worker_X = X
+
+def _fit_k_worker(n_clusters : int, **kwargs) -> dict:
+    return _fit_k(_worker_X, n_clusters, **kwargs)
+
+def _mp_context():
+    # Processos novos (forkserver, ou spawn onde ele não existe) em vez de fork: um fork feito depois que o
+    # OpenMP (libgomp) do KMeans já rodou no processo principal pode travar os workers
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+def sweep_kmeans(df_cluster, ks, random : int=42, silhouette_sample : int=None, max_memory_mb : int=512,
+        n_jobs : int=None, verbose : bool=False) -> KMeansSweep:
+    # Com silhouette_sample, a silhueta é estimada por sampled_silhouette (mesmas linhas para todos os k);
+    # sem ele, é exata para todas as linhas, calculada em blocos de até max_memory_mb (por processo).
+    # Com n_jobs > 1, cada k roda em um processo, com os núcleos divididos entre eles (em scripts, a chamada
+    # precisa ficar dentro de if __name__ == "__main__", como em qualquer pool forkserver/spawn).
+    X = np.asarray(df_cluster, dtype=np.float64)
+    ks = [int(k) for k in ks]
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    kwargs = {"random": random, "silhouette_sample": silhouette_sample, "max_memory_mb": max_memory_mb}
+
+    start = time.perf_counter()
+    results = {}
+    if not n_jobs or n_jobs == 1 or len(ks) == 1:
+        for n_clusters in ks:
+            results[n_clusters] = _fit_k(X, n_clusters, **kwargs)
+            if verbose:
+                print(f"k = {n_clusters}: {results[n_clusters]['time']:.2f}s (ajuste {results[n_clusters]['fit_time']:.2f}s)")
+    else:
+        n_jobs = min(n_jobs, len(ks))
+        kwargs["threads"] = max(1, os.cpu_count() // n_jobs)
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=_mp_context(), initializer=_init_sweep_worker,
+                                 initargs=(X,)) as executor:
+            # Os maiores k (mais lentos) entram primeiro
+            futures = {executor.submit(_fit_k_worker, n_clusters, **kwargs): n_clusters for n_clusters in sorted(ks, reverse=True)}
+            for future in as_completed(futures):
+                n_clusters = futures[future]
+                results[n_clusters] = future.result()
+                if verbose:
+                    print(f"k = {n_clusters}: {results[n_clusters]['time']:.2f}s (ajuste {results[n_clusters]['fit_time']:.2f}s)")
+
+    sweep = KMeansSweep(results, wall_time=time.perf_counter() - start)
+    if verbose:
+        print(f"{len(ks)} valores de k em {sweep.wall_time:.2f}s (soma dos k: {sum(r['time'] for r in results.values()):.2f}s)")
+    return sweep
+
+def scale_sample(df : pd.DataFrame, sample_percentual : int=100, scaler : str="original", random : int=42) -> np.ndarray:
+    df = df.sample(ceil(df.shape[0]*(sample_percentual/100)), random_state=random)
+
+    match scaler:
+        case "standard":
+            return StandardScaler().fit_transform(df)
+        case "minmax":
+            return MinMaxScaler().fit_transform(df)
+        case _:
+            return df.to_numpy()
+
+def cluster_scores(df_cluster : pd.DataFrame, initial_range : int, final_range : int, random:int=42, 
+    score_types:list=["silhouette"], width_per_ax : int=5, height_per_ax : int=5, sweep : KMeansSweep=None, n_jobs : int=None): 
+
+    sweep = sweep or sweep_kmeans(df_cluster, range(initial_range, final_range), random=random, n_jobs=n_jobs)
+    ks = list(range(initial_range, final_range))
+
+    plt.figure()
+    sweep.plot_elbow(ks)
+    plt.show()
+
+    sweep.plot_scores(score_types, ks, width_per_ax=width_per_ax, height_per_ax=height_per_ax)
+    plt.show()
+
+    # Tempo de cada k (em paralelo, o sweep inteiro leva perto do k mais lento)
+    print(sweep.timings(ks).round(2).to_string())
+    if sweep.wall_time is not None:
+        print(f"sweep: {sweep.wall_time:.2f}s")
+
+    return sweep
 
 def multi_visualize_silhoutte(df_cluster : pd.DataFrame, initial_range : int, final_range : int, 
-        per_col : int=2, random : int=42, width_per_ax : int=6, height_per_ax : int=5):
-    
+        per_col : int=2, random : int=42, width_per_ax : int=6, height_per_ax : int=5, sweep : KMeansSweep=None, n_jobs : int=None):
+
+    sweep = sweep or sweep_kmeans(df_cluster, range(initial_range, final_range), random=random, n_jobs=n_jobs)
     lines = ceil((final_range-initial_range)/per_col)
     
     fig, axes = plt.subplots(lines, per_col, figsize=(per_col*width_per_ax,lines*height_per_ax))
     for pos, nCluster in enumerate(range(initial_range, final_range)):
-        km = KMeans(n_clusters=nCluster, random_state=random)
-        
         if lines == 1:
             ax=axes[pos]
         else: 
             q, mod = divmod(pos, per_col)
             ax = axes[q][mod]
-        
-        visualizer = SilhouetteVisualizer(km, colors='yellowbrick', ax=ax)
-        visualizer.fit(df_cluster)
-        ax.set_title(f"clusters = {nCluster}\nscore = {visualizer.silhouette_score_}") 
 
-    return
+        sweep.plot_silhouette(nCluster, ax=ax)
+
+    return sweep
 
-def visualize_silhoutte(df_cluster : pd.DataFrame, n_cluster : int, random : int=42, width_per_ax : int=6, height_per_ax : int=5, versao_cluster : str="clusters"):
+def visualize_silhoutte(df_cluster : pd.DataFrame, n_cluster : int, random : int=42, width_per_ax : int=6, height_per_ax : int=5,
+        versao_cluster : str="clusters", sweep : KMeansSweep=None):
+    sweep = sweep if sweep is not None and n_cluster in sweep.results else sweep_kmeans(df_cluster, [n_cluster], random=random)
     fig, (ax1) = plt.subplots(1, 1)
     fig.set_size_inches(width_per_ax, height_per_ax)
-    km = KMeans(n_clusters=n_cluster, random_state=random)
-    visualizer = SilhouetteVisualizer(km, colors='yellowbrick', ax=ax1)
-    visualizer.fit(df_cluster)
-    ax1.set_title(f"{versao_cluster} = {n_cluster}\nscore = {visualizer.silhouette_score_}") 
+    sweep.plot_silhouette(n_cluster, ax=ax1, title=versao_cluster)
 
-    return 
+    return sweep
 
 
 def visualize_scores(
@@ -92,28 +345,25 @@ def visualize_scores(
         score_types : list=["silhouette"], 
         width_per_ax : int=5, 
         height_per_ax : int=5, 
-        per_col : int=2
+        per_col : int=2,
+        silhouette_sample : int=None,
+        max_memory_mb : int=512,
+        n_jobs : int=None
     ):
 
-    df = df.sample(ceil(df.shape[0]*(sample_percentual/100)), random_state=random)
-    
-    match scaler:
-        case "standard":
-            scaler = StandardScaler()
-            df = scaler.fit_transform(df)
-        case "minmax":
-            scaler = MinMaxScaler()
-            df = scaler.fit_transform(df)
-        case _:
-            pass
+    df = scale_sample(df, sample_percentual=sample_percentual, scaler=scaler, random=random)
+
+    # Cada k é ajustado uma única vez; cotovelo, scores e silhuetas usam o mesmo resultado
+    sweep = sweep_kmeans(df, range(initial_range, final_range), random=random,
+        silhouette_sample=silhouette_sample, max_memory_mb=max_memory_mb, n_jobs=n_jobs)
 
     cluster_scores(df_cluster=df, initial_range=initial_range, final_range=final_range, 
-        random=random, score_types=score_types, width_per_ax=width_per_ax, height_per_ax=height_per_ax)
+        random=random, score_types=score_types, width_per_ax=width_per_ax, height_per_ax=height_per_ax, sweep=sweep)
    
     multi_visualize_silhoutte(df_cluster=df, initial_range=initial_range, final_range=final_range, 
-        random=random, width_per_ax=width_per_ax, height_per_ax=height_per_ax, per_col=per_col)
+        random=random, width_per_ax=width_per_ax, height_per_ax=height_per_ax, per_col=per_col, sweep=sweep)
 
-    return 
+    return sweep
 
 def visualize_all_features(df : pd.DataFrame, n_clusters : int, cluster_colors : list):
     for cluster in range(n_clusters):
@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+DAY_NS = np.int64(24 * 60 * 60 * 10**9)
+
+def _as_ns(values) -> np.ndarray:
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[ns]').view('i8')
+
+def closest_commercial_date_index(order_dates, commerce_dates : pd.DataFrame) -> np.ndarray:
+    """
+    Posição (em commerce_dates) da data comercial mais próxima de cada pedido, em uma única passada
+    ordenada com np.searchsorted.
+
+    Reproduz o find_closest_date do feature_engineering.ipynb: a distância é abs((data - pedido).dt.days)
+    e, no empate, vence a data que aparece primeiro na tabela.
+    """
+    dates = _as_ns(commerce_dates['Datas'])
+    positions = np.argsort(dates, kind='stable')
+    sorted_dates = dates[positions]
+
+    # Datas repetidas têm a mesma distância, fica só a primeira da tabela
+    first = np.r_[True, sorted_dates[1:] != sorted_dates[:-1]]
+    positions, sorted_dates = positions[first], sorted_dates[first]
+
+    orders = _as_ns(order_dates)
+    right = np.searchsorted(sorted_dates, orders, side='right')
+    before = np.clip(right - 1, 0, len(sorted_dates) - 1)
+    after = np.clip(right, 0, len(sorted_dates) - 1)
+
+    # .dt.days arredonda para baixo, então a distância não é simétrica em torno do pedido
+    dist_before = np.abs(np.floor_divide(sorted_dates[before] - orders, DAY_NS))
+    dist_after = np.abs(np.floor_divide(sorted_dates[after] - orders, DAY_NS))
+    take_after = (dist_after < dist_before) | ((dist_after == dist_before) & (positions[after] < positions[before]))
+    return np.where(take_after, positions[after], positions[before])
+
+def add_commercial_date_features(df : pd.DataFrame, commerce_dates : pd.DataFrame,
+        date_column : str='order_purchase_timestamp') -> pd.DataFrame:
+    """
+    Adiciona comdate_diff, commercial_date_names, commercial_dates e order_week_before_comdate
+    com as mesmas regras do feature_engineering.ipynb.
+    """
+    order_dates = pd.to_datetime(df[date_column])
+    closest = closest_commercial_date_index(order_dates, commerce_dates)
+    closest_dates = pd.to_datetime(commerce_dates['Datas']).to_numpy(dtype='datetime64[ns]')[closest]
+
+    df['comdate_diff'] = np.floor_divide(_as_ns(order_dates) - closest_dates.view('i8'), DAY_NS)
+    df['commercial_date_names'] = commerce_dates['Nomes'].to_numpy()[closest]
+    df['commercial_dates'] = closest_dates
+    week_before = (df['comdate_diff'] >= -7) & (order_dates.to_numpy() <= closest_dates)
+    df['order_week_before_comdate'] = np.where(week_before, 'Yes', 'No')
+    return df
+
+def find_closest_date(order_date, commerce_dates : pd.DataFrame):
+    # Versão linha a linha original, mantida como referência para o benchmark
+    diffs = np.abs((commerce_dates['Datas'] - order_date).dt.days)
+    closest_index = diffs.argmin()
+    return commerce_dates.iloc[closest_index]
+
+def benchmark(commerce_dates : pd.DataFrame, n_orders : int=1_000_000, legacy_orders : int=2_000, random : int=42) -> pd.DataFrame:
+    """
+    Compara o .apply(find_closest_date) com closest_commercial_date_index.
+    O método antigo roda em uma amostra de legacy_orders pedidos e o tempo é extrapolado para n_orders.
+    """
+    commerce_dates = commerce_dates.assign(Datas=pd.to_datetime(commerce_dates['Datas']))
+    rng = np.random.default_rng(random)
+    start, end = commerce_dates['Datas'].min().value, commerce_dates['Datas'].max().value
+    orders = pd.Series(pd.to_datetime(rng.integers(start, end, n_orders)))
+
+    t0 = time.perf_counter()
+    legacy = orders.iloc[:legacy_orders].apply(find_closest_date, commerce_dates=commerce_dates)
+    legacy_time = (time.perf_counter() - t0) * n_orders / legacy_orders
+
+    t0 = time.perf_counter()
+    closest = closest_commercial_date_index(orders, commerce_dates)
+    vectorized_time = time.perf_counter() - t0
+
+    same = (commerce_dates['Datas'].to_numpy()[closest[:legacy_orders]] == legacy['Datas'].to_numpy()).all()
+    return pd.DataFrame({
+        'Método': ['apply(find_closest_date)', 'closest_commercial_date_index'],
+        'Pedidos': [n_orders, n_orders],
+        'Tempo (s)': [legacy_time, vectorized_time],
+        'Mesmo resultado': [same, same],
+    }).round(4)
+
+if __name__ == '__main__':
+    from pathlib import Path
+    commerce_dates = pd.read_parquet(Path(__file__).resolve().parents[2] / 'data' / 'feriados_comerciais.parquet')
+    print(benchmark(commerce_dates).to_string(index=False))
+
+# ----------- EXEMPLO DE USO -----------
+# customers_orders_payments = add_commercial_date_features(customers_orders_payments, commerce_dates)
+# python notebooks/cluster/commercial_dates.py
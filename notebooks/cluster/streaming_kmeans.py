@@ -0,0 +1,190 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.preprocessing import MinMaxScaler
+
+from notebooks import data_catalog
+
+# Linhas lidas por vez; a memória usada depende só desse valor (e de k), não do tamanho da tabela
+BATCH_SIZE = 65_536
+
+def _batches(path, batch_size : int=BATCH_SIZE, columns : list=None):
+    # Lotes em DataFrame com o índice original (__index_level_0__) restaurado pelos metadados do pandas
+    parquet = pq.ParquetFile(path)
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+        yield pa.Table.from_batches([batch], schema=batch.schema).to_pandas()
+
+def _features(df : pd.DataFrame) -> np.ndarray:
+    return df.to_numpy(dtype=np.float64)
+
+def fit_scaler(path, batch_size : int=BATCH_SIZE, random : int=42) -> tuple:
+    """
+    Primeira passada: MinMaxScaler com partial_fit e uma amostra uniforme (reservoir sampling) de até
+    batch_size linhas, usada para escolher os centróides iniciais com k-means++.
+
+    Returns:
+        O scaler ajustado, a amostra (sem escala), os nomes das colunas e o total de linhas.
+    """
+    rng = np.random.default_rng(random)
+    scaler = MinMaxScaler()
+    reservoir, n_rows, columns = None, 0, None
+    for df in _batches(path, batch_size):
+        columns = list(df.columns)
+        X = _features(df)
+        scaler.partial_fit(X)
+
+        if reservoir is None:
+            reservoir = np.empty((batch_size, X.shape[1]))
+        # A linha i (contando desde o início) entra na amostra com probabilidade batch_size / (i + 1)
+        positions = np.arange(n_rows, n_rows + len(X))
+        free = positions < batch_size
+        reservoir[positions[free]] = X[free]
+        slots = rng.integers(0, positions[~free] + 1)
+        keep = slots < batch_size
+        reservoir[slots[keep]] = X[~free][keep]
+        n_rows += len(X)
+
+    return scaler, reservoir[:min(n_rows, batch_size)], columns, n_rows
+
+def fit(path, n_clusters : int=3, batch_size : int=BATCH_SIZE, epochs : int=3, n_init : int=10, random : int=42,
+        verbose : bool=False) -> tuple:
+    """
+    Ajusta o MinMaxScaler e o MiniBatchKMeans lendo o parquet em lotes. Os centróides iniciais vêm do
+    KMeans (k-means++, melhor de n_init) na amostra da primeira passada; cada época seguinte faz partial_fit
+    em todos os lotes.
+
+    Returns:
+        O scaler, o modelo e os nomes das colunas.
+    """
+    start = time.perf_counter()
+    scaler, sample, columns, n_rows = fit_scaler(path, batch_size, random=random)
+    # Várias inicializações na amostra: com uma só (n_init do notebook), o KMeans fica em mínimos locais piores
+    init = KMeans(n_clusters, init='k-means++', n_init=n_init, random_state=random).fit(scaler.transform(sample)).cluster_centers_
+
+    model = MiniBatchKMeans(n_clusters, init=init, n_init=1, batch_size=batch_size, random_state=random)
+    for epoch in range(epochs):
+        for df in _batches(path, batch_size):
+            model.partial_fit(scaler.transform(_features(df)))
+        if verbose:
+            print(f'época {epoch + 1}/{epochs}: {n_rows} linhas em {time.perf_counter() - start:.1f}s')
+    return scaler, model, columns
+
+def predict(path, scaler, model, batch_size : int=BATCH_SIZE):
+    # (lote original, rótulos) de cada lote, sem guardar nada entre eles
+    for df in _batches(path, batch_size):
+        yield df, model.predict(scaler.transform(_features(df))).astype(np.int32)
+
+def reference_mapping(path, scaler, model, reference, batch_size : int=BATCH_SIZE) -> tuple:
+    """
+    Renumeração dos clusters do modelo para os rótulos de uma clusterização anterior da mesma tabela
+    (ex.: df_cluster_kmeans_3.parquet), pela maior concordância linha a linha (algoritmo húngaro).
+
+    Returns:
+        O novo número de cada cluster do modelo e a fração de linhas com o mesmo rótulo da referência.
+    """
+    k = model.n_clusters
+    contingency = np.zeros((k, k), dtype=np.int64)
+    references = _batches(reference, batch_size, columns=['cluster'])
+    for (_, labels), df_reference in zip(predict(path, scaler, model, batch_size), references):
+        reference_labels = df_reference['cluster'].to_numpy()
+        valid = (reference_labels >= 0) & (reference_labels < k)
+        np.add.at(contingency, (labels[valid], reference_labels[valid]), 1)
+
+    rows, cols = linear_sum_assignment(contingency, maximize=True)
+    mapping = np.empty(k, dtype=np.int32)
+    mapping[rows] = cols
+    return mapping, contingency[rows, cols].sum() / max(contingency.sum(), 1)
+
+def run(source : str='category_seasonal_data', n_clusters : int=3, output=None, reference=None,
+        batch_size : int=BATCH_SIZE, epochs : int=3, n_init : int=10, random : int=42, verbose : bool=False) -> dict:
+    """
+    Versão em streaming da clusterização final do clustering-category_seasonal_data.ipynb (MinMaxScaler +
+    KMeans com k = 3). Grava o mesmo formato do df_cluster_kmeans_{k}.parquet: colunas originais, cluster
+    (int32), hue ('cluster_i') e o índice original.
+
+    O resultado não reproduz o df_cluster_kmeans_3.parquet: o MiniBatchKMeans chega a outra solução (de
+    inércia menor), que discorda do arquivo atual em cerca de 6% das linhas. Por isso ele é gravado em um
+    arquivo próprio; as tabelas agregadas lidas pela página (df_grouped_*, sales_*, avg_spending) continuam
+    derivadas do df_cluster_kmeans_3.parquet.
+
+    Args:
+        source: Tabela do catálogo com as features.
+        output: Arquivo de saída (padrão: data/cluster_data/df_cluster_kmeans_{n_clusters}_streaming.parquet).
+        reference: Parquet de uma clusterização anterior; os clusters são renumerados para coincidir com
+            ele. Por padrão usa o df_cluster_kmeans_{n_clusters}.parquet, se existir.
+        batch_size: Linhas por lote (limita a memória usada).
+        epochs: Passadas de partial_fit sobre a tabela.
+        n_init: Inicializações do k-means++ na amostra (fica a de menor inércia).
+
+    Returns:
+        Dicionário com scaler, model, output, concordância com a referência e tempos.
+    """
+    path = data_catalog.table_path(source)
+    output = output or path.with_name(f'df_cluster_kmeans_{n_clusters}_streaming.parquet')
+    if reference is None and path.with_name(f'df_cluster_kmeans_{n_clusters}.parquet').exists():
+        reference = path.with_name(f'df_cluster_kmeans_{n_clusters}.parquet')
+
+    start = time.perf_counter()
+    scaler, model, columns = fit(path, n_clusters, batch_size, epochs=epochs, n_init=n_init, random=random, verbose=verbose)
+    fit_time = time.perf_counter() - start
+
+    mapping, agreement = np.arange(n_clusters, dtype=np.int32), None
+    if reference is not None:
+        mapping, agreement = reference_mapping(path, scaler, model, reference, batch_size)
+
+    # Escreve em um arquivo temporário e troca no final (a referência pode ser o próprio arquivo de saída)
+    start = time.perf_counter()
+    tmp_path = f'{output}.tmp'
+    hue = np.array([f'cluster_{i}' for i in range(n_clusters)], dtype=object)
+    writer = None
+    counts = np.zeros(n_clusters, dtype=np.int64)
+    try:
+        for df, labels in predict(path, scaler, model, batch_size):
+            labels = mapping[labels]
+            counts += np.bincount(labels, minlength=n_clusters)
+            df['cluster'] = labels
+            df['hue'] = hue[labels]
+            table = pa.Table.from_pandas(df, preserve_index=True)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, output)
+    predict_time = time.perf_counter() - start
+
+    if verbose:
+        concordance = f', concordância com a referência {agreement:.2%}' if agreement is not None else ''
+        if agreement is not None and agreement < 1:
+            concordance += ' (não reproduz a referência)'
+        print(f'{output}: clusters {dict(enumerate(counts.tolist()))}{concordance} '
+              f'(ajuste {fit_time:.1f}s, rótulos {predict_time:.1f}s)')
+    return {'scaler': scaler, 'model': model, 'columns': columns, 'output': output, 'counts': counts,
+            'agreement': agreement, 'timings_s': {'fit': fit_time, 'predict': predict_time}}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='KMeans em streaming (MinMaxScaler + MiniBatchKMeans) sobre o category_seasonal_data.')
+    parser.add_argument('--source', default='category_seasonal_data', help='Tabela do catálogo com as features.')
+    parser.add_argument('--n-clusters', type=int, default=3)
+    parser.add_argument('--output', default=None, help='Arquivo de saída (padrão: df_cluster_kmeans_{k}_streaming.parquet ao lado da fonte).')
+    parser.add_argument('--reference', default=None, help='Clusterização anterior usada para manter a numeração dos clusters (padrão: df_cluster_kmeans_{k}.parquet).')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--n-init', type=int, default=10)
+    parser.add_argument('--random-state', type=int, default=42)
+    args = parser.parse_args()
+
+    run(args.source, n_clusters=args.n_clusters, output=args.output, reference=args.reference,
+        batch_size=args.batch_size, epochs=args.epochs, n_init=args.n_init, random=args.random_state, verbose=True)
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.cluster.streaming_kmeans
+# python -m notebooks.cluster.streaming_kmeans --batch-size 10000 --output /tmp/df_cluster_kmeans_3.parquet
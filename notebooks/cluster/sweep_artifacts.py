@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from notebooks import data_catalog
+from notebooks.cluster import cluster_tools
+
+# Grade de tratamentos x k lida pela página de Clusterização
+SWEEP_PATH = data_catalog.DATA_DIR / 'cluster_data' / 'kmeans_sweep.npz'
+
+SCALERS = ['original', 'minmax', 'standard']
+K_VALUES = list(range(2, 11))
+
+# Valores por (tratamento, k) guardados como matriz
+SCORES = ['inertia', 'silhouette', 'silhouette_low', 'silhouette_high', 'calinski_harabasz', 'davies_bouldin',
+          'fit_time', 'silhouette_time', 'time']
+
+def compute(source : str='category_seasonal_data', scalers : list=SCALERS, ks : list=K_VALUES,
+        silhouette_sample : int=10_000, n_jobs : int=-1, random : int=42, save : bool=True, verbose : bool=False) -> dict:
+    """
+    Roda o sweep do cluster_tools (um KMeans por k) para cada tratamento dos dados, sobre a tabela inteira,
+    e junta tudo em um único .npz: scores e tempos em matrizes (tratamento, k), centróides e a silhueta
+    das linhas avaliadas em float16 com o rótulo de cada uma em int8.
+
+    Args:
+        source: Tabela do catálogo com as features.
+        silhouette_sample: Linhas com silhueta calculada (cada uma contra todas). None calcula a exata para todas.
+        n_jobs: Processos do sweep (um k por processo).
+        save: Grava o arquivo .npz.
+
+    Returns:
+        Dicionário com os arrays do arquivo.
+    """
+    df = data_catalog.read_table(source)
+    n_rows = len(df)
+    start = time.perf_counter()
+
+    artifact = {name: np.full((len(scalers), len(ks)), np.nan) for name in SCORES}
+    artifact['centers'] = np.full((len(scalers), len(ks), max(ks), df.shape[1]), np.nan, dtype=np.float32)
+    n_silhouette = min(silhouette_sample or n_rows, n_rows)
+    artifact['silhouette_samples'] = np.empty((len(scalers), len(ks), n_silhouette), dtype=np.float16)
+    artifact['silhouette_labels'] = np.empty((len(scalers), len(ks), n_silhouette), dtype=np.int8)
+    artifact['wall_time'] = np.empty(len(scalers))
+
+    for i, scaler in enumerate(scalers):
+        X = cluster_tools.scale_sample(df, 100, scaler=scaler, random=random)
+        sweep = cluster_tools.sweep_kmeans(X, ks, random=random, silhouette_sample=silhouette_sample, n_jobs=n_jobs)
+        artifact['wall_time'][i] = sweep.wall_time
+        for j, k in enumerate(ks):
+            result = sweep[k]
+            for name in SCORES:
+                artifact[name][i, j] = result[name]
+            artifact['centers'][i, j, :k] = result['centers']
+            labels = result['labels'] if result['silhouette_rows'] is None else result['labels'][result['silhouette_rows']]
+            artifact['silhouette_samples'][i, j] = result['silhouette_samples']
+            artifact['silhouette_labels'][i, j] = labels
+        if verbose:
+            print(f'{scaler}: k = {ks[0]}..{ks[-1]} em {sweep.wall_time:.1f}s')
+
+    artifact.update({
+        'scalers': np.array(scalers),
+        'ks': np.array(ks, dtype=np.int8),
+        'columns': np.array(list(df.columns)),
+        'meta': np.array(json.dumps({
+            'source': source, 'data_fingerprint': data_catalog.table_fingerprint(source), 'n_rows': n_rows,
+            'silhouette_sample': silhouette_sample if n_silhouette < n_rows else None, 'random_state': random,
+            'seconds': time.perf_counter() - start,
+        })),
+    })
+
+    if save:
+        # Escreve em um arquivo temporário e troca no final, para a página nunca ler um .npz pela metade
+        tmp_path = SWEEP_PATH.with_name(f'{SWEEP_PATH.stem}.tmp.npz')
+        np.savez_compressed(tmp_path, **artifact)
+        os.replace(tmp_path, SWEEP_PATH)
+        if verbose:
+            print(f'{SWEEP_PATH}: {SWEEP_PATH.stat().st_size / 2**20:.1f} MB')
+    return artifact
+
+def load(path=SWEEP_PATH) -> tuple:
+    """
+    Lê o arquivo gerado por compute.
+
+    Returns:
+        Um KMeansSweep por tratamento (os gráficos do cluster_tools funcionam sem ajustar nada) e os metadados.
+    """
+    with np.load(path) as arrays:
+        artifact = {name: arrays[name] for name in arrays.files}
+
+    sweeps = {}
+    for i, scaler in enumerate(artifact['scalers'].tolist()):
+        results = {}
+        for j, k in enumerate(artifact['ks'].tolist()):
+            results[k] = {name: float(artifact[name][i, j]) for name in SCORES}
+            results[k].update({
+                'centers': artifact['centers'][i, j, :k],
+                'labels': artifact['silhouette_labels'][i, j],
+                'silhouette_samples': artifact['silhouette_samples'][i, j].astype(np.float32),
+                'silhouette_rows': None,
+            })
+        sweeps[scaler] = cluster_tools.KMeansSweep(results, wall_time=float(artifact['wall_time'][i]))
+    return sweeps, json.loads(artifact['meta'].item())
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pré-calcula o sweep de KMeans (tratamentos x k) da página de Clusterização.')
+    parser.add_argument('--source', default='category_seasonal_data', help='Tabela do catálogo com as features.')
+    parser.add_argument('--k-max', type=int, default=10)
+    parser.add_argument('--silhouette-sample', type=int, default=10_000, help='Linhas com silhueta calculada (0: todas, exata).')
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    compute(args.source, ks=list(range(2, args.k_max + 1)), silhouette_sample=args.silhouette_sample or None,
+            n_jobs=args.n_jobs, verbose=True)
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.cluster.sweep_artifacts
+# sweeps, meta = load()
+# sweeps['minmax'].plot_silhouette(3)
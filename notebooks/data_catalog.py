@@ -0,0 +1,233 @@
+import hashlib
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Diretório data/ na raiz do projeto, independente de onde o código é executado
+# (streamlit roda na raiz, os notebooks rodam dentro de notebooks/)
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+
+CATALOG = {
+    # Tabelas originais do Olist
+    'customers': 'olist_customers_dataset.parquet',
+    'geolocation': 'olist_geolocation_dataset.parquet',
+    'order_items': 'olist_order_items_dataset.parquet',
+    'order_payments': 'olist_order_payments_dataset.parquet',
+    'order_reviews': 'olist_order_reviews_dataset.parquet',
+    'orders': 'olist_orders_dataset.parquet',
+    'products': 'olist_products_dataset.parquet',
+    'sellers': 'olist_sellers_dataset.parquet',
+    'category_translation': 'product_category_name_translation.parquet',
+    'commercial_dates': 'feriados_comerciais.parquet',
+
+    # Tabelas derivadas
+    'eda_dataset': 'outputs/eda_dataset.parquet',
+    'df_w_commercial_dates': 'outputs/df_w_commercial_dates.parquet',
+    'order_reviews_normalized': 'outputs/order_reviews_normalized.parquet',
+    'score_df_1': 'outputs/score_df_1.parquet',
+    'score_df_2': 'outputs/score_df_2.parquet',
+    'score_df_3': 'outputs/score_df_3.parquet',
+    'results': 'outputs/results.parquet',
+    'review_predictions': 'outputs/review_predictions.parquet',
+    'satisfaction_model_comparison': 'outputs/satisfaction_model_comparison.parquet',
+    'tuning_results': 'outputs/tuning_results.parquet',
+
+    # Cubos agregados da Análise Exploratória (gerados pelo rollups.py)
+    'rollup_category_review_score': 'outputs/rollups/category_review_score.parquet',
+    'rollup_customer_state_counts': 'outputs/rollups/customer_state_counts.parquet',
+    'rollup_freight_by_state': 'outputs/rollups/freight_by_state.parquet',
+    'rollup_freight_outliers': 'outputs/rollups/freight_outliers.parquet',
+    'rollup_payment_type_counts': 'outputs/rollups/payment_type_counts.parquet',
+    'rollup_price_log_density': 'outputs/rollups/price_log_density.parquet',
+    'rollup_orders_per_year_month': 'outputs/rollups/orders_per_year_month.parquet',
+    'rollup_orders_per_weekday': 'outputs/rollups/orders_per_weekday.parquet',
+    'rollup_orders_per_time_day': 'outputs/rollups/orders_per_time_day.parquet',
+
+    # Clusterização
+    'category_seasonal_data': 'cluster_data/category_seasonal_data.parquet',
+    'df_cluster_kmeans_3': 'cluster_data/df_cluster_kmeans_3.parquet',
+    'eda_clusters': 'cluster_data/eda_clusters.parquet',
+    'avg_spending': 'cluster_data/avg_spending.parquet',
+    'avg_spending_formatted': 'cluster_data/avg_spending_formatted.parquet',
+    'df_grouped_category_per_cluster': 'cluster_data/df_grouped_category_per_cluster.parquet',
+    'df_grouped_commercialdate_per_cluster': 'cluster_data/df_grouped_commercialdate_per_cluster.parquet',
+    'sales_price_per_cluster': 'cluster_data/sales_price_per_cluster.parquet',
+    'sales_price_volume': 'cluster_data/sales_price_volume.parquet',
+    'sales_volume_per_cluster': 'cluster_data/sales_volume_per_cluster.parquet',
+}
+
+# Hashes de 32 caracteres que identificam as entidades do Olist
+ID_COLUMNS = ['order_id', 'customer_id', 'customer_unique_id', 'product_id', 'seller_id', 'review_id']
+
+TIMESTAMP_COLUMNS = [
+    'order_purchase_timestamp', 'order_approved_at', 'order_delivered_carrier_date',
+    'order_delivered_customer_date', 'order_estimated_delivery_date', 'shipping_limit_date',
+    'review_creation_date', 'review_answer_timestamp'
+]
+
+def table_path(name : str) -> Path:
+    if name not in CATALOG:
+        raise KeyError(f"A tabela '{name}' não existe no catálogo. Tabelas disponíveis: {sorted(CATALOG)}")
+    return DATA_DIR / CATALOG[name]
+
+# Chave usada para guardar a impressão digital das entradas nos metadados dos parquets gerados pelo join_engine
+FINGERPRINT_KEY = b'olist_join_fingerprint'
+
+_file_fingerprints = {}
+
+def file_fingerprint(path) -> str:
+    # Hash do conteúdo, recalculado só quando o tamanho ou a data de modificação mudam
+    stat = Path(path).stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_fingerprints:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _file_fingerprints[key] = digest.hexdigest()
+    return _file_fingerprints[key]
+
+def table_fingerprint(name : str) -> str:
+    # Visões do join_engine já guardam a impressão digital no rodapé; as demais usam o hash do arquivo
+    path = table_path(name)
+    value = (pq.read_schema(path).metadata or {}).get(FINGERPRINT_KEY)
+    return value.decode() if value else file_fingerprint(path)
+
+def table_columns(name : str) -> list:
+    # Lê apenas o schema do rodapé do parquet, sem carregar dados
+    return pq.read_schema(table_path(name)).names
+
+def isin(column : str, values) -> list:
+    return [(column, 'in', list(values))]
+
+def between(column : str, start=None, end=None) -> list:
+    filters = []
+    if start is not None:
+        filters.append((column, '>=', start))
+    if end is not None:
+        filters.append((column, '<=', end))
+    return filters
+
+def memory_report(before : pd.DataFrame, after : pd.DataFrame, verbose : bool=True) -> pd.DataFrame:
+    report = pd.DataFrame({
+        'Tipo antes': before.dtypes.astype(str),
+        'Tipo depois': after.dtypes.astype(str),
+        'Antes (MB)': before.memory_usage(deep=True, index=False) / 2**20,
+        'Depois (MB)': after.memory_usage(deep=True, index=False) / 2**20,
+    }).round(2)
+
+    if verbose:
+        total_before = report['Antes (MB)'].sum()
+        total_after = report['Depois (MB)'].sum()
+        print(report.to_string())
+        print(f'Total: {total_before:.1f} MB -> {total_after:.1f} MB ({total_before / max(total_after, 1e-9):.1f}x menor)')
+    return report
+
+def compact_frame(df : pd.DataFrame, category_ratio : float=0.5) -> pd.DataFrame:
+    """
+    Reduz a memória do DataFrame: IDs e colunas de baixa cardinalidade viram category,
+    inteiros e decimais são rebaixados para o menor tipo e as datas viram datetime64.
+
+    Uso nos notebooks e na análise de memória: as páginas do app leem pelo shared_frame(), que já
+    mantém os dados em Arrow e não passa por aqui.
+
+    Args:
+        df: DataFrame original (não é alterado).
+        category_ratio: Razão máxima únicos/linhas para uma coluna de texto virar category.
+    """
+    df = df.copy(deep=False)
+    for col in df.columns:
+        series = df[col]
+        if col in TIMESTAMP_COLUMNS:
+            df[col] = pd.to_datetime(series)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        elif pd.api.types.is_bool_dtype(series):
+            continue
+        elif pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='unsigned' if (series >= 0).all() else 'integer')
+        elif pd.api.types.is_float_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='float')
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if col in ID_COLUMNS or series.nunique(dropna=False) <= category_ratio * len(series):
+                df[col] = series.astype('category')
+    return df
+
+def read_table(name : str, columns : list=None, filters : list=None, compact : bool=False, verbose : bool=False) -> pd.DataFrame:
+    """
+    Lê uma tabela do catálogo lendo apenas as colunas e row groups necessários.
+
+    Args:
+        name: Nome da tabela no CATALOG.
+        columns: Colunas a serem lidas. None lê todas.
+        filters: Predicados no formato do pyarrow, ex.: [('payment_type', 'in', ['boleto'])].
+            Podem ser combinados com isin() e between().
+        compact: Retorna o DataFrame compactado por compact_frame() (só nos notebooks; o app usa shared_frame()).
+        verbose: Com compact, imprime o relatório de memória antes/depois.
+
+    Returns:
+        Um DataFrame com as colunas e linhas selecionadas.
+    """
+    path = table_path(name)
+    # O pyarrow não aceita 'in' com lista vazia; nesse caso nenhuma linha passa no filtro
+    if any(op == 'in' and len(values) == 0 for _, op, values in filters or []):
+        table = pq.read_schema(path).empty_table()
+        return table.select(columns).to_pandas() if columns else table.to_pandas()
+
+    if not compact:
+        table = pq.read_table(path, columns=columns, filters=filters or None, use_pandas_metadata=True)
+        return table.to_pandas()
+
+    # Os IDs já saem do parquet como dicionário do Arrow, sem criar um objeto str por linha
+    ids = [col for col in ID_COLUMNS if col in pq.read_schema(path).names]
+    table = pq.read_table(path, columns=columns, filters=filters or None, use_pandas_metadata=True, read_dictionary=ids)
+    df = compact_frame(table.to_pandas())
+
+    if verbose:
+        memory_report(read_table(name, columns=columns, filters=filters), df)
+    return df
+
+# Cache do processo: uma única cópia (somente leitura) de cada tabela, compartilhada por todas as sessões
+_shared_tables = {}
+_shared_lock = threading.Lock()
+
+def shared_table(name : str, columns : list=None):
+    """
+    Retorna a pyarrow.Table com as colunas pedidas (None: todas), lida uma vez por processo com memory map.
+    Cada projeção é guardada separadamente, então só as colunas usadas saem do disco.
+    A tabela é recarregada quando o arquivo muda no disco.
+    """
+    path = table_path(name)
+    version = path.stat().st_mtime_ns
+    key = (name, tuple(columns) if columns is not None else None)
+    with _shared_lock:
+        cached = _shared_tables.get(key)
+        if cached is None or cached[0] != version:
+            names = pq.read_schema(path).names if columns is None else columns
+            ids = [col for col in ID_COLUMNS if col in names]
+            table = pq.read_table(path, columns=columns, memory_map=True, use_pandas_metadata=True, read_dictionary=ids)
+            cached = _shared_tables[key] = (version, table)
+    return cached[1]
+
+def shared_frame(name : str, columns : list=None, filters : list=None) -> pd.DataFrame:
+    """
+    DataFrame apoiado nos buffers do Arrow de shared_table(), sem cópia dos dados.
+
+    Cada chamada devolve um novo objeto DataFrame, então colunas derivadas adicionadas por uma
+    sessão não aparecem nas outras nem alteram a tabela compartilhada.
+    """
+    table = shared_table(name, columns=columns)
+    if filters:
+        if any(op == 'in' and len(values) == 0 for _, op, values in filters):
+            table = table.slice(0, 0)
+        else:
+            table = table.filter(pq.filters_to_expression(filters))
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+# ----------- EXEMPLO DE USO -----------
+# read_table('eda_dataset', columns=['payment_type', 'price'], filters=isin('payment_type', ['boleto', 'voucher']))
+# read_table('df_w_commercial_dates', columns=['order_purchase_year_month'], filters=between('order_purchase_year_month', '201701', '201712'))
+# read_table('eda_dataset', compact=True, verbose=True)
+# df = shared_frame('eda_dataset', columns=['payment_type', 'price'])
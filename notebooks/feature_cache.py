@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+
+from notebooks import data_catalog
+
+# Matrizes de features já calculadas, uma pasta por conjunto (ex.: text_rf) e por chave
+FEATURES_DIR = data_catalog.DATA_DIR / 'outputs' / 'features'
+
+# Chaves antigas mantidas por conjunto; as mais velhas são apagadas ao gravar uma nova
+MAX_ENTRIES = 3
+
+def cache_key(*parts) -> str:
+    # As partes precisam ter repr estável (textos, números, dicionários de parâmetros simples)
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def cache_dir(name : str, key : str) -> Path:
+    return FEATURES_DIR / name / key
+
+def save(name : str, key : str, objects : dict) -> Path:
+    """
+    Grava os objetos da entrada: arrays em .npy, matrizes esparsas em .npz e o resto em joblib.
+    A pasta só aparece no lugar final depois de escrita por inteiro.
+    """
+    path = cache_dir(name, key)
+    tmp_path = path.with_name(f'{key}.tmp-{os.getpid()}')
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    manifest = {}
+    for obj_name, obj in objects.items():
+        if sp.issparse(obj):
+            sp.save_npz(tmp_path / f'{obj_name}.npz', sp.csr_matrix(obj), compressed=False)
+            manifest[obj_name] = 'npz'
+        elif isinstance(obj, np.ndarray) and obj.dtype != object:
+            np.save(tmp_path / f'{obj_name}.npy', obj)
+            manifest[obj_name] = 'npy'
+        else:
+            joblib.dump(obj, tmp_path / f'{obj_name}.joblib')
+            manifest[obj_name] = 'joblib'
+    with open(tmp_path / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    _prune(name)
+    return path
+
+def load(name : str, key : str, mmap : bool=True):
+    # None quando a entrada não existe (ou ficou incompleta)
+    path = cache_dir(name, key)
+    try:
+        with open(path / 'manifest.json', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    objects = {}
+    for obj_name, kind in manifest.items():
+        if kind == 'npz':
+            objects[obj_name] = sp.load_npz(path / f'{obj_name}.npz')
+        elif kind == 'npy':
+            objects[obj_name] = np.load(path / f'{obj_name}.npy', mmap_mode='r' if mmap else None)
+        else:
+            objects[obj_name] = joblib.load(path / f'{obj_name}.joblib')
+    os.utime(path)
+    return objects
+
+def cached(name : str, key : str, build, force : bool=False, verbose : bool=False) -> tuple:
+    """
+    Lê a entrada (name, key) ou, se ela não existir, chama build() e grava o resultado.
+
+    Returns:
+        Os objetos e um bool que indica se vieram do cache.
+    """
+    if not force:
+        start = time.perf_counter()
+        objects = load(name, key)
+        if objects is not None:
+            if verbose:
+                print(f'{name}: features lidas do cache em {time.perf_counter() - start:.2f}s ({key})')
+            return objects, True
+
+    start = time.perf_counter()
+    objects = build()
+    save(name, key, objects)
+    if verbose:
+        print(f'{name}: features calculadas em {time.perf_counter() - start:.2f}s ({key})')
+    return objects, False
+
+def _prune(name : str):
+    entries = [path for path in (FEATURES_DIR / name).iterdir() if (path / 'manifest.json').exists()]
+    entries.sort(key=lambda path: path.stat().st_mtime_ns, reverse=True)
+    for path in entries[MAX_ENTRIES:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def clear(name : str=None):
+    shutil.rmtree(FEATURES_DIR / name if name else FEATURES_DIR, ignore_errors=True)
+
+# ----------- EXEMPLO DE USO -----------
+# key = cache_key(data_catalog.table_fingerprint('score_df_3'), 'review_comment_message')
+# objects, hit = cached('text_rf', key, lambda: {'tfidf': tfidf.fit_transform(X), 'target': y.to_numpy()})
@@ -0,0 +1,182 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from notebooks import data_catalog
+from notebooks.cluster.commercial_dates import closest_commercial_date_index
+
+# Chaves de junção do esquema estrela do Olist (hashes hexadecimais de 32 caracteres)
+JOIN_KEYS = ['order_id', 'customer_id', 'product_id', 'seller_id']
+
+def add_purchase_date_features(df : pd.DataFrame) -> pd.DataFrame:
+    # Mesmas colunas do general_eda.ipynb, calculadas pelo acessor .dt em vez de .apply
+    timestamp = pd.to_datetime(df['order_purchase_timestamp'])
+    df['order_purchase_timestamp'] = timestamp
+    df['order_purchase_year'] = timestamp.dt.year
+    df['order_purchase_month'] = timestamp.dt.month
+    df['order_purchase_month_name'] = timestamp.dt.strftime('%b')
+    df['order_purchase_year_month'] = timestamp.dt.strftime('%Y%m')
+    df['order_purchase_date'] = timestamp.dt.strftime('%Y%m%d')
+
+    df['order_purchase_day'] = timestamp.dt.day
+    df['order_purchase_dayofweek'] = timestamp.dt.dayofweek
+    df['order_purchase_dayofweek_name'] = timestamp.dt.strftime('%a')
+
+    df['order_purchase_hour'] = timestamp.dt.hour
+    hours_bins = [-0.1, 6, 12, 18, 23]
+    hours_labels = ['Madrugada', 'Manhã', 'Tarde', 'Noite']
+    df['order_purchase_time_day'] = pd.cut(df['order_purchase_hour'], hours_bins, labels=hours_labels)
+    return df
+
+def add_closest_commercial_date(df : pd.DataFrame, commerce_dates : pd.DataFrame) -> pd.DataFrame:
+    closest = closest_commercial_date_index(df['order_purchase_timestamp'], commerce_dates)
+    df['closest_commercial_date'] = pd.to_datetime(commerce_dates['Datas']).to_numpy()[closest]
+    df['commercial_date_name'] = commerce_dates['Nomes'].to_numpy()[closest]
+    return df
+
+def _commercial_dates_view(frames : dict) -> pd.DataFrame:
+    df = add_purchase_date_features(frames['eda_dataset'])
+    return add_closest_commercial_date(df, frames['commercial_dates'])
+
+# Visões materializadas: tabela base, junções em ordem (tabela, chave) e pós-processamento opcional.
+# Uma entrada pode ser outra visão, que é materializada antes.
+VIEWS = {
+    'eda_dataset': {
+        'base': 'orders',
+        'joins': [
+            ('order_items', 'order_id'),
+            ('customers', 'customer_id'),
+            ('order_reviews', 'order_id'),
+            ('order_payments', 'order_id'),
+            ('sellers', 'seller_id'),
+            ('products', 'product_id'),
+        ],
+    },
+    'df_w_commercial_dates': {
+        'base': 'eda_dataset',
+        'joins': [],
+        'inputs': ['commercial_dates'],
+        'post': _commercial_dates_view,
+    },
+}
+
+def view_inputs(name : str) -> list:
+    view = VIEWS[name]
+    return [view['base']] + [table for table, _ in view['joins']] + view.get('inputs', [])
+
+def view_fingerprint(name : str) -> str:
+    # Combina o conteúdo das entradas com a definição da visão, assim mudar uma junção também invalida
+    view = VIEWS[name]
+    parts = {table: data_catalog.file_fingerprint(data_catalog.table_path(table)) for table in view_inputs(name)}
+    parts['__definition__'] = repr((view['base'], view['joins'], view.get('inputs', []),
+                                    getattr(view.get('post'), '__name__', None)))
+    return hashlib.blake2b(json.dumps(parts, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+def stored_fingerprint(name : str):
+    path = data_catalog.table_path(name)
+    if not path.exists():
+        return None
+    metadata = pq.read_schema(path).metadata or {}
+    value = metadata.get(data_catalog.FINGERPRINT_KEY)
+    return value.decode() if value else None
+
+def is_stale(name : str) -> bool:
+    for table in view_inputs(name):
+        if table in VIEWS and is_stale(table):
+            return True
+    return stored_fingerprint(name) != view_fingerprint(name)
+
+def encode_keys(frames : dict, keys : list=JOIN_KEYS) -> dict:
+    """
+    Troca as chaves string por códigos inteiros com um dicionário comum a todas as tabelas.
+
+    Returns:
+        Um dicionário chave -> pd.Index com os valores originais, usado para decodificar.
+    """
+    dictionaries = {}
+    for key in keys:
+        columns = [frame[key] for frame in frames.values() if key in frame.columns]
+        if not columns:
+            continue
+        categories = pd.Index(pd.unique(np.concatenate([col.to_numpy(dtype=object) for col in columns])))
+        for frame in frames.values():
+            if key in frame.columns:
+                frame[key] = categories.get_indexer(frame[key]).astype(np.int32)
+        dictionaries[key] = categories
+    return dictionaries
+
+def decode_keys(df : pd.DataFrame, dictionaries : dict) -> pd.DataFrame:
+    for key, categories in dictionaries.items():
+        if key in df.columns:
+            df[key] = categories.take(df[key].to_numpy()).to_numpy()
+    return df
+
+def build_view(name : str) -> pd.DataFrame:
+    view = VIEWS[name]
+    frames = {table: data_catalog.read_table(table) for table in view_inputs(name)}
+
+    if view['joins']:
+        dictionaries = encode_keys(frames)
+        df = frames[view['base']]
+        for table, key in view['joins']:
+            df = df.merge(frames[table], on=key, how='inner')
+        frames[view['base']] = decode_keys(df, dictionaries)
+
+    if 'post' in view:
+        return view['post'](frames)
+    return frames[view['base']]
+
+def materialize(name : str, force : bool=False, verbose : bool=False):
+    """
+    Gera o parquet da visão somente se a impressão digital de alguma entrada mudou.
+
+    Returns:
+        O caminho do parquet da visão.
+    """
+    # Visões usadas como entrada são atualizadas antes, para que a impressão digital reflita o conteúdo novo
+    for table in view_inputs(name):
+        if table in VIEWS:
+            materialize(table, verbose=verbose)
+
+    path = data_catalog.table_path(name)
+    fingerprint = view_fingerprint(name)
+    if not force and stored_fingerprint(name) == fingerprint:
+        if verbose:
+            print(f'{name}: atualizado ({fingerprint})')
+        return path
+
+    start = time.perf_counter()
+    df = build_view(name)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), data_catalog.FINGERPRINT_KEY: fingerprint.encode()})
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Nome único por escrita: duas execuções da mesma visão ao mesmo tempo não escrevem no mesmo arquivo temporário
+    tmp_path = path.with_name(f'{path.stem}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}')
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+    if verbose:
+        print(f'{name}: {len(df)} linhas geradas em {time.perf_counter() - start:.2f}s ({fingerprint})')
+    return path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Materializa as visões do esquema estrela do Olist em parquet.')
+    parser.add_argument('views', nargs='*', default=list(VIEWS), help='Visões a materializar (padrão: todas).')
+    parser.add_argument('--force', action='store_true', help='Reconstrói mesmo que as entradas não tenham mudado.')
+    args = parser.parse_args()
+
+    for view_name in args.views:
+        materialize(view_name, force=args.force, verbose=True)
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.join_engine eda_dataset
+# materialize('df_w_commercial_dates')
@@ -0,0 +1,296 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.metrics import accuracy_score, confusion_matrix, f1_score, precision_score, recall_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+from threadpoolctl import threadpool_limits
+
+from notebooks import data_catalog, feature_cache
+
+SEED = 42
+TARGET = 'review_score_factor'
+
+# Entra na chave do feature_cache; muda quando o conteúdo guardado por load_features muda
+FEATURES_VERSION = 2
+
+# Colunas do score_df_* que não entram como feature (as mesmas do new_prediction_models.ipynb)
+DROP_COLUMNS = ['order_id', 'customer_id', 'order_status', 'order_purchase_timestamp', 'order_approved_at', 'order_delivered_carrier_date',
+                'order_delivered_customer_date', 'order_estimated_delivery_date', 'review_id', 'review_comment_title', 'review_score',
+                'review_creation_date', 'review_comment_message', 'review_answer_timestamp', 'payment_sequential', 'payment_type', 'customer_unique_id',
+                'customer_zip_code_prefix', 'customer_city', 'customer_state', 'order_item_id', 'product_id', 'seller_id', 'shipping_limit_date', 'price',
+                'freight_value', 'product_category_name', 'product_length_cm', 'product_height_cm', 'product_width_cm',
+                'seller_zip_code_prefix', 'seller_city', 'seller_state', 'review_score_factor', 'delivery']
+
+# Arquivos lidos pela página de Classificação, além do results.parquet
+FEATURE_IMPORTANCES_PATH = data_catalog.DATA_DIR / 'outputs' / 'all_feature_importances.csv'
+CONFUSION_MATRICES_PATH = data_catalog.DATA_DIR / 'outputs' / 'new_all_confusion_matrices.csv'
+
+def _xgboost(threads : int):
+    import xgboost as xgb
+    return xgb.XGBClassifier(eval_metric='mlogloss', n_jobs=threads)
+
+# Modelos comparados, com os mesmos parâmetros do notebook; cada função recebe o número de threads do worker
+CANDIDATES = {
+    'Logistic Regression': lambda threads: LogisticRegression(max_iter=1000, random_state=SEED),
+    'Decision Tree': lambda threads: DecisionTreeClassifier(random_state=SEED),
+    'Random Forest': lambda threads: RandomForestClassifier(n_estimators=100, random_state=SEED, n_jobs=threads),
+    'K-Nearest Neighbors': lambda threads: KNeighborsClassifier(n_neighbors=5, n_jobs=threads),
+    'Gradient Boosting': lambda threads: GradientBoostingClassifier(n_estimators=100, random_state=SEED),
+    'XGBoost': _xgboost,
+    'Linear Regression': lambda threads: LinearRegression(),
+}
+
+# Modelos dos arquivos da página de Classificação (os seis classificadores do results.parquet original).
+# A regressão linear (nota arredondada para a classe mais próxima) só aparece no retorno de compare,
+# nunca nos arquivos gravados: incluí-la mudaria a lista de modelos da página
+PAGE_MODELS = [name for name in CANDIDATES if name != 'Linear Regression']
+
+def load_features(source : str='score_df_3', force : bool=False, verbose : bool=False) -> dict:
+    """
+    Matriz de features do notebook (colunas fora de DROP_COLUMNS, nulos trocados pela média) e o alvo,
+    montada uma vez por versão da tabela e guardada no feature_cache.
+
+    Returns:
+        Dicionário com X (float64), X_raw (com os nulos, usado na validação cruzada), target,
+        columns e key (chave da entrada no cache).
+    """
+    columns = [col for col in data_catalog.table_columns(source) if col not in DROP_COLUMNS]
+    key = feature_cache.cache_key(data_catalog.table_fingerprint(source), TARGET, columns, FEATURES_VERSION)
+
+    def build():
+        df = data_catalog.read_table(source, columns=columns + [TARGET])
+        features = df[columns].astype('float64')
+        return {'X': features.fillna(features.mean()).to_numpy(), 'X_raw': features.to_numpy(),
+                'target': df[TARGET].to_numpy(), 'columns': np.array(columns, dtype=object)}
+
+    data, _ = feature_cache.cached(f'tabular_{source}', key, build, force=force, verbose=verbose)
+    return {**data, 'columns': list(data['columns']), 'key': key}
+
+def split_indices(n_rows : int, test_size : float=0.2, random_state : int=SEED) -> tuple:
+    # Mesmo sorteio do train_test_split(features, rating, test_size=0.2, random_state=42) do notebook
+    return train_test_split(np.arange(n_rows), test_size=test_size, random_state=random_state)
+
+def build_folds(source : str, data : dict, n_splits : int=5, random_state : int=SEED, verbose : bool=False) -> str:
+    """
+    Divide os dados em n_splits folds estratificados e, para cada fold, ajusta a imputação pela média só
+    com as linhas de treino. As matrizes já transformadas de cada fold ficam no feature_cache e são
+    lidas (memory map) por todos os modelos, sem refazer a divisão nem a imputação por modelo.
+
+    Returns:
+        A chave da entrada dos folds no cache.
+    """
+    key = feature_cache.cache_key(data['key'], n_splits, random_state)
+
+    def build():
+        folds = {}
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+        for fold, (train_idx, test_idx) in enumerate(splitter.split(data['X_raw'], data['target'])):
+            imputer = SimpleImputer(strategy='mean', keep_empty_features=True).fit(data['X_raw'][train_idx])
+            folds[f'X_train_{fold}'] = imputer.transform(data['X_raw'][train_idx])
+            folds[f'X_test_{fold}'] = imputer.transform(data['X_raw'][test_idx])
+            folds[f'y_train_{fold}'] = data['target'][train_idx]
+            folds[f'y_test_{fold}'] = data['target'][test_idx]
+            folds[f'imputer_{fold}'] = imputer
+        return folds
+
+    feature_cache.cached(f'folds_{source}', key, build, verbose=verbose)
+    return key
+
+def _predict(model, X, classes):
+    predictions = model.predict(X)
+    if not hasattr(model, 'classes_'):
+        # Regressão: a nota prevista é arredondada para a classe mais próxima
+        predictions = np.clip(np.rint(predictions), classes.min(), classes.max())
+    return predictions
+
+def _scores(y, predictions) -> dict:
+    return {
+        'Accuracy': accuracy_score(y, predictions),
+        'Precision': precision_score(y, predictions, average='macro', zero_division=0),
+        'Recall': recall_score(y, predictions, average='macro', zero_division=0),
+        'F1': f1_score(y, predictions, average='macro', zero_division=0),
+    }
+
+def _fit_and_score(name : str, X_train, y_train, X_test, y_test, classes, threads : int) -> dict:
+    with threadpool_limits(limits=threads):
+        model = CANDIDATES[name](threads)
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        train_pred = _predict(model, X_train, classes)
+        test_pred = _predict(model, X_test, classes)
+        predict_time = time.perf_counter() - start
+
+    return {
+        'Model': name,
+        'Train': _scores(y_train, train_pred),
+        'Test': _scores(y_test, test_pred),
+        'confusion': confusion_matrix(y_test, test_pred, labels=classes),
+        'importances': getattr(model, 'feature_importances_', None),
+        'fit_s': fit_time,
+        'predict_s': predict_time,
+    }
+
+def fit_candidate(name : str, source : str, key : str, train_idx, test_idx, threads : int=1) -> dict:
+    """
+    Treina um modelo de CANDIDATES no split indicado, lendo a matriz do cache (memory map).
+
+    Returns:
+        Métricas de treino e teste, matriz de confusão, importâncias (quando o modelo tem) e tempos.
+    """
+    data = feature_cache.load(f'tabular_{source}', key)
+    X, y = data['X'], data['target']
+    return _fit_and_score(name, X[train_idx], y[train_idx], X[test_idx], y[test_idx], np.unique(y), threads)
+
+def fit_fold(name : str, source : str, folds_key : str, fold : int, threads : int=1) -> dict:
+    # Um modelo em um fold da validação cruzada, com as matrizes já imputadas pelo build_folds
+    folds = feature_cache.load(f'folds_{source}', folds_key)
+    y_train, y_test = folds[f'y_train_{fold}'], folds[f'y_test_{fold}']
+    classes = np.unique(np.concatenate([y_train, y_test]))
+    outcome = _fit_and_score(name, folds[f'X_train_{fold}'], y_train, folds[f'X_test_{fold}'], y_test, classes, threads)
+    return {**outcome, 'fold': fold}
+
+def results_frame(outcomes : list) -> pd.DataFrame:
+    rows = [{'Model': outcome['Model'], 'Set': split, **outcome[split],
+             'Treino (s)': outcome['fit_s'], 'Previsão (s)': outcome['predict_s']}
+            for outcome in outcomes for split in ['Train', 'Test']]
+    return pd.DataFrame(rows)
+
+def cv_results_frame(fold_outcomes : list, n_splits : int) -> pd.DataFrame:
+    # Média e desvio padrão das métricas de teste dos folds, na mesma tabela do results.parquet
+    folds = pd.DataFrame([{'Model': outcome['Model'], **outcome['Test'], 'Treino (s)': outcome['fit_s'],
+                           'Previsão (s)': outcome['predict_s']} for outcome in fold_outcomes])
+    grouped = folds.groupby('Model', sort=False)
+    metrics = ['Accuracy', 'Precision', 'Recall', 'F1']
+    frame = grouped[metrics + ['Treino (s)', 'Previsão (s)']].mean()
+    std = grouped[metrics].std(ddof=1).add_suffix(' (std)')
+    frame = pd.concat([frame, std], axis=1).reset_index()
+    frame.insert(1, 'Set', f'CV ({n_splits} folds)')
+    return frame
+
+def importances_frame(outcomes : list, columns : list) -> pd.DataFrame:
+    frames = [pd.DataFrame({'Feature': columns, 'Importance': outcome['importances'], 'Model': outcome['Model']})
+              .sort_values(by='Importance', ascending=False)
+              for outcome in outcomes if outcome['importances'] is not None]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Feature', 'Importance', 'Model'])
+
+def confusion_frame(outcomes : list) -> pd.DataFrame:
+    # Formato longo do new_all_confusion_matrices.csv: Actual (classe real), Model, Class (classe prevista), Count
+    frames = []
+    for outcome in outcomes:
+        matrix = outcome['confusion']
+        labels = [f'Class {i}' for i in range(matrix.shape[0])]
+        frame = pd.DataFrame(matrix, index=labels, columns=labels).rename_axis('Actual').reset_index()
+        frame = frame.melt(id_vars=['Actual'], var_name='Class', value_name='Count')
+        frame.insert(1, 'Model', outcome['Model'])
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+def available_models(models : list) -> list:
+    # XGBoost é opcional: sem o pacote instalado, o modelo fica de fora da comparação
+    try:
+        import xgboost  # noqa: F401
+    except ImportError:
+        if 'XGBoost' in models:
+            print('xgboost não está instalado; XGBoost fica de fora da comparação.')
+        return [name for name in models if name != 'XGBoost']
+    return list(models)
+
+def compare(models : list=PAGE_MODELS, source : str='score_df_3', cv : int=0, n_jobs : int=None, save : bool=True,
+        verbose : bool=False) -> dict:
+    """
+    Treina os modelos ao mesmo tempo, um por processo, sobre a mesma matriz de features, e gera os
+    arquivos da página de Classificação: results.parquet, all_feature_importances.csv e
+    new_all_confusion_matrices.csv. O results.parquet ganha o tempo de treino e de previsão de cada modelo.
+
+    Args:
+        models: Nomes de CANDIDATES a treinar (padrão: PAGE_MODELS).
+        source: Tabela do catálogo com as features (score_df_1, score_df_2 ou score_df_3).
+        cv: Número de folds da validação cruzada (0 desliga). Os folds rodam no mesmo pool que o split
+            de treino/teste e entram no results.parquet como o conjunto 'CV (k folds)', com média e desvio padrão.
+        n_jobs: Processos simultâneos (padrão: um por treino, até o número de núcleos).
+        save: Grava os três arquivos, só com os modelos de PAGE_MODELS.
+
+    Returns:
+        Dicionário com os DataFrames results, importances e confusion e o tempo total em segundos.
+    """
+    start = time.perf_counter()
+    models = available_models(models)
+    data = load_features(source, verbose=verbose)
+    train_idx, test_idx = split_indices(len(data['target']))
+    folds_key = build_folds(source, data, n_splits=cv, verbose=verbose) if cv else None
+
+    n_jobs = n_jobs or min(len(models) * (1 + cv), os.cpu_count())
+    threads = max(1, os.cpu_count() // n_jobs)
+    outcomes, fold_outcomes = {}, []
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = [executor.submit(fit_candidate, name, source, data['key'], train_idx, test_idx, threads) for name in models]
+        futures += [executor.submit(fit_fold, name, source, folds_key, fold, threads) for name in models for fold in range(cv)]
+        for future in as_completed(futures):
+            outcome = future.result()
+            if 'fold' in outcome:
+                fold_outcomes.append(outcome)
+                continue
+            outcomes[outcome['Model']] = outcome
+            if verbose:
+                print(f"{outcome['Model']}: treino {outcome['fit_s']:.2f}s, F1 de teste {outcome['Test']['F1']:.4f}")
+
+    # Ordem dos arquivos igual à de CANDIDATES, independente de qual modelo terminou primeiro
+    outcomes = [outcomes[name] for name in models]
+    results = results_frame(outcomes)
+    if cv:
+        fold_outcomes.sort(key=lambda outcome: (models.index(outcome['Model']), outcome['fold']))
+        results = pd.concat([results, cv_results_frame(fold_outcomes, cv)], ignore_index=True)
+    report = {
+        'results': results,
+        'importances': importances_frame(outcomes, data['columns']),
+        'confusion': confusion_frame(outcomes),
+    }
+
+    if save:
+        extra = [name for name in models if name not in PAGE_MODELS]
+        if extra and verbose:
+            print(f'{extra} fora dos arquivos da página (só no resultado retornado).')
+        page = {name: frame[frame['Model'].isin(PAGE_MODELS)] for name, frame in report.items()}
+        page['results'].to_parquet(data_catalog.table_path('results'), index=False)
+        page['importances'].to_csv(FEATURE_IMPORTANCES_PATH, index=False)
+        page['confusion'].to_csv(CONFUSION_MATRICES_PATH, index=False)
+
+    report['seconds'] = time.perf_counter() - start
+    if verbose:
+        total_fit = sum(o['fit_s'] for o in outcomes + fold_outcomes)
+        print(f"Comparação concluída em {report['seconds']:.2f}s (soma dos treinos: {total_fit:.2f}s)")
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Treina os modelos de classificação em paralelo e gera os arquivos da página de Classificação.')
+    parser.add_argument('models', nargs='*', help='Modelos a treinar (padrão: os classificadores da página; Linear Regression só com o nome explícito).')
+    parser.add_argument('--source', default='score_df_3', help='Tabela do catálogo com as features.')
+    parser.add_argument('--cv', type=int, default=0, help='Número de folds da validação cruzada (padrão: só o split 80/20).')
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--no-save', action='store_true', help='Só mostra os resultados, sem gravar os arquivos.')
+    args = parser.parse_args()
+    # Sem choices no argparse: no Python 3.11 a lista padrão (ou vazia) é conferida contra choices e a execução sem argumentos falha
+    unknown = [name for name in args.models if name not in CANDIDATES]
+    if unknown:
+        parser.error(f'modelos desconhecidos: {unknown} (opções: {list(CANDIDATES)})')
+    args.models = args.models or PAGE_MODELS
+
+    report = compare(args.models, source=args.source, cv=args.cv, n_jobs=args.n_jobs, save=not args.no_save, verbose=True)
+    print(report['results'].round(4).to_string(index=False))
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.model_comparison
+# python -m notebooks.model_comparison --cv 5
+# python -m notebooks.model_comparison "Random Forest" XGBoost --source score_df_1 --no-save
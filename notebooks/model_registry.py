@@ -0,0 +1,137 @@
+import argparse
+import gzip
+import importlib
+import io
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from notebooks.pipeline_timing import timings
+
+# Diretório notebooks/, onde os notebooks de treino salvam os modelos
+MODELS_DIR = Path(__file__).resolve().parent
+
+# source: arquivo gerado pelo treino (pickle, opcionalmente gzip); fast: cópia em joblib sem compressão,
+# que abre com memory map e evita descompactar e copiar os arrays das árvores a cada carga;
+# meta: metadados gravados pelo train_model (parâmetros, dados e tempos do treino)
+REGISTRY = {
+    'satisfaction_rf': {'source': 'model_rf.pkl.gz', 'fast': 'models/model_rf.joblib', 'meta': 'model_rf.json'},
+    'satisfaction_compact': {'source': 'model_compact.pkl.gz', 'fast': 'models/model_compact.joblib'},
+}
+
+# Módulo com as classes que os notebooks de treino salvaram como __main__.*
+MAIN_MODULE = 'notebooks.sentiment'
+
+def model_path(name : str, kind : str='source') -> Path:
+    if name not in REGISTRY:
+        raise KeyError(f"O modelo '{name}' não existe no registro. Modelos disponíveis: {sorted(REGISTRY)}")
+    return MODELS_DIR / REGISTRY[name][kind]
+
+class _MainUnpickler(pickle.Unpickler):
+    # Modelos treinados em notebook referenciam as classes como __main__.SentimentAnalyzer;
+    # aqui elas são procuradas no módulo indicado em vez do __main__ de quem está carregando
+    def __init__(self, file, main_module=None):
+        super().__init__(file)
+        self.main_module = main_module
+
+    def find_class(self, module, name):
+        if module == '__main__' and self.main_module is not None:
+            return getattr(self.main_module, name)
+        return super().find_class(module, name)
+
+def read_pickle(path, main_module=None):
+    path = Path(path)
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rb') as f:
+        return _MainUnpickler(io.BytesIO(f.read()), main_module=main_module).load()
+
+def export_fast(name : str, model=None, main_module=None) -> Path:
+    """
+    Grava a cópia joblib sem compressão do modelo, usada por load_model.
+
+    Returns:
+        O caminho do arquivo gerado.
+    """
+    if model is None:
+        model = read_pickle(model_path(name), main_module=main_module or importlib.import_module(MAIN_MODULE))
+    path = model_path(name, 'fast')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.joblib.tmp')
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+def _is_fast_current(name : str) -> bool:
+    fast, source = model_path(name, 'fast'), model_path(name)
+    if not fast.exists():
+        return False
+    return not source.exists() or fast.stat().st_mtime_ns >= source.stat().st_mtime_ns
+
+# Cache do processo: cada modelo é carregado uma vez e compartilhado por todas as sessões
+_models = {}
+_stats = {}
+_lock = threading.Lock()
+
+def load_model(name : str, mmap : bool=True, main_module=None):
+    """
+    Retorna o modelo do registro, carregado uma única vez por processo.
+
+    Usa a cópia joblib (com memory map dos arrays quando mmap=True) se ela estiver em dia com o arquivo
+    do treino; caso contrário lê o pickle original e gera a cópia para as próximas cargas.
+
+    Args:
+        name: Nome do modelo em REGISTRY.
+        mmap: Abre os arrays da cópia joblib em modo somente leitura, sem copiá-los para a memória.
+        main_module: Módulo onde procurar as classes salvas como __main__ (padrão: MAIN_MODULE).
+    """
+    source = model_path(name)
+    version = source.stat().st_mtime_ns if source.exists() else None
+    with _lock:
+        cached = _models.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        start = time.perf_counter()
+        if _is_fast_current(name):
+            path, fmt = model_path(name, 'fast'), 'joblib (mmap)' if mmap else 'joblib'
+            model = joblib.load(path, mmap_mode='r' if mmap else None)
+        else:
+            path, fmt = source, 'pickle'
+            model = read_pickle(source, main_module=main_module or importlib.import_module(MAIN_MODULE))
+            try:
+                export_fast(name, model)
+            except (OSError, pickle.PicklingError):
+                # Diretório somente leitura ou classes que não podem ser reimportadas: segue com o modelo já carregado
+                pass
+
+        timings.record(f'model_load.{name}', time.perf_counter() - start)
+        _stats[name] = {
+            'Modelo': name,
+            'Formato': fmt,
+            'Arquivo': str(path),
+            'Tamanho (MB)': round(path.stat().st_size / 2**20, 2),
+            'Carga (s)': round(time.perf_counter() - start, 4),
+        }
+        _models[name] = (version, model)
+    return model
+
+def load_stats() -> pd.DataFrame:
+    # Formato, tamanho e tempo da última carga de cada modelo neste processo
+    return pd.DataFrame(list(_stats.values()))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera as cópias rápidas (joblib) dos modelos do registro.')
+    parser.add_argument('models', nargs='*', default=list(REGISTRY), help='Modelos a exportar (padrão: todos).')
+    args = parser.parse_args()
+
+    for model_name in args.models:
+        print(f'{model_name}: {export_fast(model_name)}')
+
+# ----------- EXEMPLO DE USO -----------
+# model_rf = load_model('satisfaction_rf')
+# load_stats()
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import loguniform, randint, uniform
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV, StratifiedKFold
+
+from notebooks import data_catalog, model_comparison
+
+# Espaços de busca de cada modelo (nomes de model_comparison.CANDIDATES)
+SEARCH_SPACES = {
+    'Random Forest': {
+        'n_estimators': randint(100, 501),
+        'max_depth': [None, 10, 20, 30, 40, 60],
+        'min_samples_leaf': randint(1, 9),
+        'max_features': ['sqrt', 'log2', 0.3, 0.5],
+        'class_weight': [None, 'balanced'],
+    },
+    'XGBoost': {
+        'n_estimators': randint(100, 801),
+        'max_depth': randint(3, 11),
+        'learning_rate': loguniform(0.01, 0.3),
+        'subsample': uniform(0.6, 0.4),
+        'colsample_bytree': uniform(0.5, 0.5),
+        'min_child_weight': randint(1, 11),
+    },
+}
+
+# Gravados ao lado do results.parquet
+TUNING_BEST_PATH = data_catalog.DATA_DIR / 'outputs' / 'tuning_best.json'
+
+def _json_safe(params : dict) -> dict:
+    return {name: value.item() if isinstance(value, np.generic) else value for name, value in params.items()}
+
+def tune(name : str, data : dict, train_idx, test_idx, n_candidates='exhaust', factor : int=3, cv : int=3,
+        n_jobs : int=None, verbose : bool=False) -> tuple:
+    """
+    Busca por successive halving: muitas configurações sorteadas avaliadas em poucas linhas, e as
+    melhores (1/factor de cada rodada) promovidas para rodadas com factor vezes mais linhas.
+
+    Returns:
+        As linhas da curva de aprendizado (uma por candidato e rodada) e o resumo da melhor configuração.
+    """
+    X, y = data['X'], data['target'].astype(int)
+    # Cada tentativa usa um núcleo; o paralelismo fica por conta das tentativas simultâneas
+    search = HalvingRandomSearchCV(
+        model_comparison.CANDIDATES[name](1), SEARCH_SPACES[name], n_candidates=n_candidates, factor=factor,
+        resource='n_samples', min_resources='exhaust' if n_candidates != 'exhaust' else 'smallest',
+        cv=StratifiedKFold(n_splits=cv, shuffle=True, random_state=model_comparison.SEED), scoring='f1_macro',
+        refit=True, return_train_score=False, random_state=model_comparison.SEED, n_jobs=n_jobs,
+    )
+    start = time.perf_counter()
+    search.fit(X[train_idx], y[train_idx])
+    seconds = time.perf_counter() - start
+
+    results = pd.DataFrame(search.cv_results_)
+    curve = pd.DataFrame({
+        'Model': name,
+        'iter': results['iter'],
+        'n_resources': results['n_resources'],
+        'params': results['params'].map(lambda params: json.dumps(_json_safe(params), sort_keys=True)),
+        'mean_test_score': results['mean_test_score'],
+        'std_test_score': results['std_test_score'],
+        'mean_fit_time': results['mean_fit_time'],
+    })
+    best_params = json.dumps(_json_safe(search.best_params_), sort_keys=True)
+    curve['is_best'] = curve['params'] == best_params
+
+    test_pred = model_comparison._predict(search.best_estimator_, X[test_idx], np.unique(y))
+    best = {
+        'params': _json_safe(search.best_params_),
+        'cv_f1_macro': float(search.best_score_),
+        'test': model_comparison._scores(y[test_idx], test_pred),
+        'n_candidates': [int(n) for n in search.n_candidates_],
+        'n_resources': [int(n) for n in search.n_resources_],
+        'seconds': seconds,
+    }
+    if verbose:
+        print(f"{name}: {len(results)} avaliações em {seconds:.1f}s, F1 (cv) {best['cv_f1_macro']:.4f}, "
+              f"F1 (teste) {best['test']['F1']:.4f}, {best['params']}")
+    return curve, best
+
+def run(models : list=list(SEARCH_SPACES), source : str='score_df_3', n_candidates='exhaust', factor : int=3,
+        cv : int=3, n_jobs : int=-1, save : bool=True, verbose : bool=False) -> dict:
+    """
+    Ajusta os hiperparâmetros de cada modelo sobre a matriz em cache do model_comparison, no mesmo
+    split 80/20 (a busca só vê as linhas de treino; a melhor configuração é avaliada no teste).
+
+    Grava a curva de aprendizado de todas as rodadas em tuning_results.parquet e a melhor configuração
+    de cada modelo em tuning_best.json, ao lado do results.parquet.
+
+    Returns:
+        Dicionário com curve (DataFrame) e best (melhor configuração por modelo).
+    """
+    models = [name for name in model_comparison.available_models(models) if name in SEARCH_SPACES]
+    data = model_comparison.load_features(source, verbose=verbose)
+    train_idx, test_idx = model_comparison.split_indices(len(data['target']))
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+
+    curves, best = [], {}
+    for name in models:
+        curve, best[name] = tune(name, data, train_idx, test_idx, n_candidates=n_candidates, factor=factor,
+                                 cv=cv, n_jobs=n_jobs, verbose=verbose)
+        curves.append(curve)
+    curve = pd.concat(curves, ignore_index=True)
+
+    if save:
+        curve.to_parquet(data_catalog.table_path('tuning_results'), index=False)
+        with open(TUNING_BEST_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'source': source, 'data_fingerprint': data_catalog.table_fingerprint(source), 'models': best},
+                      f, ensure_ascii=False, indent=2)
+    return {'curve': curve, 'best': best}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Busca de hiperparâmetros por successive halving (Random Forest e XGBoost).')
+    parser.add_argument('models', nargs='*', help='Modelos a ajustar (padrão: todos).')
+    parser.add_argument('--source', default='score_df_3', help='Tabela do catálogo com as features.')
+    parser.add_argument('--n-candidates', type=int, default=None, help='Configurações sorteadas na primeira rodada (padrão: o máximo que cabe nos dados).')
+    parser.add_argument('--factor', type=int, default=3, help='Fração mantida (1/factor) e aumento de linhas a cada rodada.')
+    parser.add_argument('--cv', type=int, default=3)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--no-save', action='store_true', help='Só mostra o resultado, sem gravar os arquivos.')
+    args = parser.parse_args()
+    # Sem choices no argparse: no Python 3.11 a lista padrão (ou vazia) é conferida contra choices e a execução sem argumentos falha
+    unknown = [name for name in args.models if name not in SEARCH_SPACES]
+    if unknown:
+        parser.error(f'modelos desconhecidos: {unknown} (opções: {list(SEARCH_SPACES)})')
+    args.models = args.models or list(SEARCH_SPACES)
+
+    report = run(args.models, source=args.source, n_candidates=args.n_candidates or 'exhaust', factor=args.factor,
+                 cv=args.cv, n_jobs=args.n_jobs, save=not args.no_save, verbose=True)
+    print(report['curve'].groupby(['Model', 'iter', 'n_resources'])['mean_test_score'].agg(['count', 'max']).to_string())
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.model_tuning
+# python -m notebooks.model_tuning "Random Forest" --n-candidates 81 --factor 3
@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import FeatureUnion, Pipeline
+
+# Limites superiores (ms) das faixas do histograma; a última faixa recebe o que passar de 5 s
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, np.inf]
+
+# Métodos medidos em cada etapa
+TIMED_METHODS = ['transform', 'predict', 'predict_proba']
+
+class StageTimings:
+    """
+    Histogramas de tempo por etapa do pipeline, com os últimos tempos guardados para os percentis.
+    Pode ser juntado com o de outros processos (snapshot/merge), como nos workers do batch_scoring.
+    """
+    def __init__(self, recent : int=5_000):
+        self._lock = threading.Lock()
+        self._recent_size = recent
+        self._stages = {}
+
+    def _stage(self, stage : str) -> dict:
+        if stage not in self._stages:
+            self._stages[stage] = {'buckets': np.zeros(len(BUCKETS_MS), dtype=np.int64), 'total': 0.0,
+                                   'count': 0, 'recent': deque(maxlen=self._recent_size)}
+        return self._stages[stage]
+
+    def record(self, stage : str, seconds : float):
+        ms = seconds * 1000
+        with self._lock:
+            data = self._stage(stage)
+            data['buckets'][np.searchsorted(BUCKETS_MS, ms)] += 1
+            data['total'] += ms
+            data['count'] += 1
+            data['recent'].append(ms)
+
+    def snapshot(self, reset : bool=False) -> dict:
+        with self._lock:
+            snapshot = {stage: {'buckets': data['buckets'].tolist(), 'total': data['total'],
+                                'count': data['count'], 'recent': list(data['recent'])}
+                        for stage, data in self._stages.items()}
+            if reset:
+                self._stages = {}
+        return snapshot
+
+    def merge(self, snapshot : dict):
+        with self._lock:
+            for stage, other in snapshot.items():
+                data = self._stage(stage)
+                data['buckets'] += np.asarray(other['buckets'], dtype=np.int64)
+                data['total'] += other['total']
+                data['count'] += other['count']
+                data['recent'].extend(other['recent'])
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+
+    def summary(self) -> pd.DataFrame:
+        rows = []
+        for stage, data in self.snapshot().items():
+            recent = np.array(data['recent']) if data['recent'] else np.zeros(1)
+            rows.append({
+                'Etapa': stage,
+                'Chamadas': data['count'],
+                'Média (ms)': data['total'] / max(data['count'], 1),
+                'p50 (ms)': np.percentile(recent, 50),
+                'p95 (ms)': np.percentile(recent, 95),
+                'p99 (ms)': np.percentile(recent, 99),
+            })
+        return pd.DataFrame(rows, columns=['Etapa', 'Chamadas', 'Média (ms)', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)'])
+
+    def histogram(self) -> pd.DataFrame:
+        labels = [f'≤ {edge:g} ms' if np.isfinite(edge) else f'> {BUCKETS_MS[-2]:g} ms' for edge in BUCKETS_MS]
+        rows = [{'Etapa': stage, 'Faixa': label, 'Ordem': i, 'Chamadas': count}
+                for stage, data in self.snapshot().items()
+                for i, (label, count) in enumerate(zip(labels, data['buckets']))]
+        return pd.DataFrame(rows, columns=['Etapa', 'Faixa', 'Ordem', 'Chamadas'])
+
+    def export(self, path):
+        # JSON com os histogramas, para comparar execuções antes e depois de um novo treino
+        snapshot = self.snapshot()
+        for data in snapshot.values():
+            data.pop('recent')
+        payload = {'buckets_ms': [edge if np.isfinite(edge) else None for edge in BUCKETS_MS],
+                   'stages': snapshot, 'summary': self.summary().to_dict(orient='records')}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+
+# Histogramas do processo, compartilhados pela página e pelos jobs
+timings = StageTimings()
+
+_active = threading.local()
+
+def _timed(method, stage : str, target : StageTimings):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        # Só a chamada mais externa de cada etapa conta (ex.: o predict da floresta chama o predict_proba)
+        active = _active.__dict__.setdefault('stages', set())
+        if stage in active:
+            return method(*args, **kwargs)
+        active.add(stage)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            target.record(stage, time.perf_counter() - start)
+            active.discard(stage)
+    wrapper._timed_original = method
+    return wrapper
+
+def _stages(estimator, prefix : str=''):
+    # Etapas medidas: o pipeline inteiro, cada passo e cada ramo do FeatureUnion
+    yield prefix or 'pipeline', estimator
+    if isinstance(estimator, Pipeline):
+        for name, step in estimator.steps:
+            if step not in (None, 'passthrough'):
+                yield from _stages(step, f'{prefix}.{name}' if prefix else name)
+    elif isinstance(estimator, FeatureUnion):
+        for name, transformer in estimator.transformer_list:
+            if transformer not in (None, 'drop', 'passthrough'):
+                yield f'{prefix}.{name}', transformer
+
+def instrument(model, target : StageTimings=None):
+    """
+    Passa a medir transform/predict/predict_proba de cada etapa do modelo (sem mudar o resultado).
+    Chamar de novo no mesmo modelo não duplica as medições.
+    """
+    target = target or timings
+    for stage, estimator in _stages(model):
+        for method_name in TIMED_METHODS:
+            method = estimator.__dict__.get(method_name)
+            if method is not None and hasattr(method, '_timed_original'):
+                continue
+            if hasattr(estimator, method_name):
+                setattr(estimator, method_name, _timed(getattr(estimator, method_name), stage, target))
+    return model
+
+def uninstrument(model):
+    # Remove as medições (necessário antes de salvar o modelo com pickle)
+    for _, estimator in _stages(model):
+        for method_name in TIMED_METHODS:
+            if hasattr(estimator.__dict__.get(method_name), '_timed_original'):
+                delattr(estimator, method_name)
+    return model
+
+# ----------- EXEMPLO DE USO -----------
+# instrument(model_rf)
+# model_rf.predict(['Chegou antes do prazo'])
+# timings.summary()
+# timings.export('timings.json')
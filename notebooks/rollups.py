@@ -0,0 +1,138 @@
+import argparse
+import hashlib
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy.stats import gaussian_kde
+
+from notebooks import data_catalog
+
+# Agregados usados pelas abas da Análise Exploratória, pequenos o bastante para a página ler inteiros
+def _category_review_score(df : pd.DataFrame) -> pd.DataFrame:
+    df = df.dropna(subset=['product_category_name'])
+    grouped = df.groupby('product_category_name', observed=True)['review_score'].agg(['sum', 'count'])
+    # O título é aplicado nas ~70 categorias, não em cada linha
+    grouped.index = grouped.index.map(lambda x: x.replace('_', ' ').title())
+    grouped = grouped.groupby(level=0).sum()
+    grouped['review_score'] = grouped['sum'] / grouped['count']
+    return grouped.rename_axis('product_category_name').reset_index()[['product_category_name', 'review_score', 'count']]
+
+def _customer_state_counts(df : pd.DataFrame) -> pd.DataFrame:
+    count_data = df['customer_state'].value_counts().reset_index()
+    count_data.columns = ['customer_state', 'count']
+    return count_data
+
+def _freight_by_state(df : pd.DataFrame) -> pd.DataFrame:
+    # Estatísticas do boxplot; os pontos fora dos bigodes ficam no freight_outliers
+    df = df[df['freight_value'] != -1]
+    def box(values):
+        q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        return pd.Series({'lower': inside.min(), 'q1': q1, 'median': median, 'q3': q3, 'upper': inside.max(), 'count': len(values)})
+    box_stats = df.groupby('customer_state', observed=True)['freight_value'].apply(box).unstack()
+    return box_stats.astype({'count': 'int64'}).reset_index()
+
+def _freight_outliers(df : pd.DataFrame) -> pd.DataFrame:
+    # Pontos fora dos bigodes, desenhados pelo mark_boxplot; valores repetidos no mesmo estado viram um ponto só
+    df = df[df['freight_value'] != -1]
+    quantiles = df.groupby('customer_state', observed=True)['freight_value'].quantile([0.25, 0.75]).unstack()
+    iqr = quantiles[0.75] - quantiles[0.25]
+    low = df['customer_state'].map(quantiles[0.25] - 1.5 * iqr).astype('float64')
+    high = df['customer_state'].map(quantiles[0.75] + 1.5 * iqr).astype('float64')
+    outliers = df[(df['freight_value'] < low) | (df['freight_value'] > high)]
+    outliers = outliers.groupby(['customer_state', 'freight_value'], observed=True).size().rename('count')
+    return outliers.reset_index()
+
+def _payment_type_counts(df : pd.DataFrame) -> pd.DataFrame:
+    count_data = df.loc[df['payment_type'] != 'not_defined', 'payment_type'].value_counts().reset_index()
+    count_data.columns = ['payment_type', 'count']
+    return count_data
+
+def _price_log_density(df : pd.DataFrame) -> pd.DataFrame:
+    df = df[df['payment_type'] != 'not_defined']
+    density_data = []
+    for group, prices in df.groupby('payment_type', observed=True)['price']:
+        subset = np.log(prices.to_numpy(dtype='float64') + 1.5)
+        kde = gaussian_kde(subset)
+        x = np.linspace(subset.min(), subset.max(), 100)
+        density_data.append(pd.DataFrame({'price_log': x, 'densidade': kde(x), 'payment_type': group}))
+    return pd.concat(density_data, ignore_index=True)
+
+def _value_counts(column, name):
+    def build(df : pd.DataFrame) -> pd.DataFrame:
+        count_data = df[column].value_counts().reset_index()
+        count_data.columns = [name, 'count']
+        return count_data
+    build.__name__ = f'_{name}_counts'
+    return build
+
+ROLLUPS = {
+    'category_review_score': {'source': 'eda_dataset', 'columns': ['product_category_name', 'review_score'], 'build': _category_review_score},
+    'customer_state_counts': {'source': 'eda_dataset', 'columns': ['customer_state'], 'build': _customer_state_counts},
+    'freight_by_state': {'source': 'eda_dataset', 'columns': ['customer_state', 'freight_value'], 'build': _freight_by_state},
+    'freight_outliers': {'source': 'eda_dataset', 'columns': ['customer_state', 'freight_value'], 'build': _freight_outliers},
+    'payment_type_counts': {'source': 'eda_dataset', 'columns': ['payment_type'], 'build': _payment_type_counts},
+    'price_log_density': {'source': 'eda_dataset', 'columns': ['payment_type', 'price'], 'build': _price_log_density},
+    'orders_per_year_month': {'source': 'df_w_commercial_dates', 'columns': ['order_purchase_year_month'],
+                              'build': _value_counts('order_purchase_year_month', 'year_month')},
+    'orders_per_weekday': {'source': 'df_w_commercial_dates', 'columns': ['order_purchase_dayofweek'],
+                           'build': _value_counts('order_purchase_dayofweek', 'day_of_week')},
+    'orders_per_time_day': {'source': 'df_w_commercial_dates', 'columns': ['order_purchase_time_day'],
+                            'build': _value_counts('order_purchase_time_day', 'time_period')},
+}
+
+def rollup_fingerprint(name : str) -> str:
+    rollup = ROLLUPS[name]
+    parts = [data_catalog.table_fingerprint(rollup['source']), rollup['build'].__name__, *rollup['columns']]
+    return hashlib.blake2b('|'.join(parts).encode(), digest_size=16).hexdigest()
+
+def is_stale(name : str) -> bool:
+    path = data_catalog.table_path(f'rollup_{name}')
+    if not path.exists():
+        return True
+    stored = (pq.read_schema(path).metadata or {}).get(data_catalog.FINGERPRINT_KEY)
+    return stored is None or stored.decode() != rollup_fingerprint(name)
+
+def build_rollup(name : str, force : bool=False, verbose : bool=False):
+    if not force and not is_stale(name):
+        return data_catalog.table_path(f'rollup_{name}')
+
+    rollup = ROLLUPS[name]
+    df = data_catalog.read_table(rollup['source'], columns=rollup['columns'])
+    cube = rollup['build'](df)
+
+    table = pa.Table.from_pandas(cube, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), data_catalog.FINGERPRINT_KEY: rollup_fingerprint(name).encode()})
+    path = data_catalog.table_path(f'rollup_{name}')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Nome único por escrita: duas sessões (ou processos) podem gerar o mesmo cubo ao mesmo tempo
+    tmp_path = path.with_name(f'{path.stem}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}')
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+    if verbose:
+        print(f'{name}: {len(cube)} linhas a partir de {rollup["source"]}')
+    return path
+
+def read_rollup(name : str) -> pd.DataFrame:
+    # Gera o cubo na primeira leitura depois de uma nova versão dos dados
+    build_rollup(name)
+    return data_catalog.read_table(f'rollup_{name}')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pré-calcula os cubos agregados da Análise Exploratória.')
+    parser.add_argument('rollups', nargs='*', default=list(ROLLUPS), help='Cubos a gerar (padrão: todos).')
+    parser.add_argument('--force', action='store_true', help='Recalcula mesmo que os dados não tenham mudado.')
+    args = parser.parse_args()
+
+    for rollup_name in args.rollups:
+        build_rollup(rollup_name, force=args.force, verbose=True)
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.rollups
+# read_rollup('customer_state_counts')
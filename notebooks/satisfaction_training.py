@@ -0,0 +1,145 @@
+import argparse
+import gzip
+import json
+import pickle
+import platform
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.metrics import accuracy_score, precision_recall_fscore_support
+from sklearn.model_selection import train_test_split
+
+from notebooks import data_catalog, model_registry
+from notebooks.sentiment import create_compact_pipeline, create_pipeline, set_store
+
+# Modelos que o script sabe treinar: nome no registro e função que monta o pipeline
+MODELS = {
+    'rf': {'registry': 'satisfaction_rf', 'label': 'Random Forest (TF-IDF + LeIA)', 'build': create_pipeline},
+    'compact': {'registry': 'satisfaction_compact', 'label': 'Logistic Regression (hashing + LeIA)', 'build': create_compact_pipeline},
+}
+
+def load_training_data(source : str='score_df_3', text_column : str='review_comment_message', target : str='review_score'):
+    df = data_catalog.read_table(source, columns=[text_column, target])
+    return df[text_column].fillna(''), df[target]
+
+def evaluate(model, X, y) -> dict:
+    predictions = model.predict(X)
+    precision, recall, f1, _ = precision_recall_fscore_support(y, predictions, average='macro', zero_division=0)
+    return {'Accuracy': accuracy_score(y, predictions), 'Precision': precision, 'Recall': recall, 'F1': f1}
+
+# Modelos treinados pela comparação; o modelo em produção (registro) só é trocado com deploy=True
+COMPARISON_DIR = data_catalog.DATA_DIR / 'outputs' / 'model_comparison'
+
+def save_model(model, name : str, path=None):
+    # Mesmo formato do model_rf.pkl.gz usado pela página; o registro gera a cópia rápida na primeira carga
+    path = path or model_registry.model_path(MODELS[name]['registry'])
+    with gzip.open(path, 'wb') as f:
+        pickle.dump(set_store(model, False), f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+def write_metadata(name : str, model, path, **fields):
+    # Reescreve os metadados do registro (o mesmo arquivo do train_model) para descrever o modelo implantado
+    registry = model_registry.REGISTRY[MODELS[name]['registry']]
+    if 'meta' not in registry:
+        return None
+    clf = model.steps[-1][1]
+    metadata = {
+        'model': MODELS[name]['registry'],
+        **fields,
+        'params': clf.get_params(),
+        'classes': clf.classes_.tolist(),
+        'versions': {'python': platform.python_version(), 'numpy': np.__version__, 'sklearn': sklearn.__version__},
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'trained_by': 'satisfaction_training',
+        'artifact': path.name,
+        'artifact_mb': path.stat().st_size / 2**20,
+    }
+    meta_path = model_registry.model_path(MODELS[name]['registry'], 'meta')
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2, default=str)
+    return meta_path
+
+def load_time(path) -> float:
+    start = time.perf_counter()
+    model_registry.read_pickle(path)
+    return time.perf_counter() - start
+
+def single_review_latency(model, texts, n_reviews : int=200) -> dict:
+    # Uma review por chamada, como na página; textos distintos para não medir o cache do SentimentAnalyzer
+    texts = pd.Series(texts).drop_duplicates().head(n_reviews).tolist()
+    model.predict(texts[:1])
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        model.predict([text])
+        timings.append(time.perf_counter() - start)
+    return {'p50 (ms)': np.percentile(timings, 50) * 1000, 'p99 (ms)': np.percentile(timings, 99) * 1000}
+
+def train(name : str, X_train, y_train, store : bool=True):
+    model = MODELS[name]['build'](store=store)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    return model, time.perf_counter() - start
+
+def compare(models : list=list(MODELS), source : str='score_df_3', test_size : float=0.2, random_state : int=42,
+        save : bool=True, deploy : bool=False, verbose : bool=False) -> pd.DataFrame:
+    """
+    Treina os modelos no mesmo split, grava os artefatos e monta a comparação com as métricas de
+    teste, o tamanho do arquivo, o tempo de carga e a latência p50/p99 de uma review.
+    As linhas de teste do results.parquet entram como referência.
+
+    Com save, os modelos vão para COMPARISON_DIR; os arquivos do registro (usados pelas páginas e pelo
+    serviço) só são substituídos com deploy=True.
+    """
+    X, y = load_training_data(source)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+
+    rows = []
+    for name in models:
+        model, fit_time = train(name, X_train, y_train)
+        row = {'Model': MODELS[name]['label'], 'Set': 'Test', **evaluate(model, X_test, y_test), 'Treino (s)': fit_time}
+        if save:
+            COMPARISON_DIR.mkdir(parents=True, exist_ok=True)
+            path = save_model(model, name, COMPARISON_DIR / model_registry.model_path(MODELS[name]['registry']).name)
+            row['Tamanho (MB)'] = path.stat().st_size / 2**20
+            row['Carga (s)'] = load_time(path)
+        if deploy:
+            path = save_model(model, name)
+            write_metadata(name, model, path, source=source, data_fingerprint=data_catalog.table_fingerprint(source),
+                           n_samples=len(X_train), timings_s={'fit': fit_time})
+        row.update(single_review_latency(set_store(model, False), X_test))
+        rows.append(row)
+        if verbose:
+            print(pd.Series(row).to_string(), '\n')
+
+    reference = data_catalog.read_table('results')
+    reference = reference[reference['Set'] == 'Test'].assign(Model=lambda d: d['Model'] + ' (results.parquet)')
+    comparison = pd.concat([pd.DataFrame(rows), reference], ignore_index=True)
+
+    if save:
+        comparison.to_parquet(data_catalog.table_path('satisfaction_model_comparison'), index=False)
+    return comparison
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Treina os modelos de satisfação e compara qualidade, tamanho e latência.')
+    parser.add_argument('models', nargs='*', help='Modelos a treinar (padrão: todos).')
+    parser.add_argument('--source', default='score_df_3', help='Tabela do catálogo usada no treino.')
+    parser.add_argument('--no-save', action='store_true', help='Não grava os modelos nem a comparação.')
+    parser.add_argument('--deploy', action='store_true', help='Substitui os modelos do registro (usados pelas páginas) pelos treinados aqui.')
+    args = parser.parse_args()
+    # Sem choices no argparse: no Python 3.11 a lista padrão (ou vazia) é conferida contra choices e a execução sem argumentos falha
+    unknown = [name for name in args.models if name not in MODELS]
+    if unknown:
+        parser.error(f'modelos desconhecidos: {unknown} (opções: {list(MODELS)})')
+    args.models = args.models or list(MODELS)
+
+    result = compare(args.models, source=args.source, save=not args.no_save, deploy=args.deploy, verbose=True)
+    print(result.round(4).to_string(index=False))
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.satisfaction_training
+# python -m notebooks.satisfaction_training compact --no-save
+# python -m notebooks.satisfaction_training compact --deploy   (grava o model_compact.pkl.gz do registro)
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from notebooks import data_catalog
+
+SAMPLE_TEXTS = [
+    'Produto chegou antes do prazo, recomendo',
+    'Não recebi o produto até agora',
+    'Qualidade boa, mas a entrega atrasou',
+    'Péssimo atendimento, produto com defeito',
+    'Tudo certo, muito satisfeito com a compra',
+]
+
+def load_texts(source : str=None, n_texts : int=5_000) -> list:
+    # Reviews reais do catálogo quando disponíveis; senão, os textos de exemplo
+    if source is None:
+        return SAMPLE_TEXTS
+    texts = data_catalog.read_table(source, columns=['review_comment_message'])['review_comment_message'].dropna()
+    return texts.head(n_texts).tolist() or SAMPLE_TEXTS
+
+async def _post(reader, writer, host : str, body : bytes) -> dict:
+    writer.write((f'POST /predict HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                  f'Content-Length: {len(body)}\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+    await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        if key.strip().lower() == 'content-length':
+            length = int(value)
+    return json.loads(await reader.readexactly(length))
+
+async def _client(host : str, port : int, texts : list, requests : int, offset : int, latencies : list):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(requests):
+            body = json.dumps({'text': texts[(offset + i) % len(texts)]}).encode('utf-8')
+            start = time.perf_counter()
+            await _post(reader, writer, host, body)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+async def _get(host : str, port : int, path : str) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+async def run(host : str='127.0.0.1', port : int=8765, concurrency : int=32, requests : int=2_000, texts : list=None) -> dict:
+    """
+    Dispara requests previsões (uma review por requisição) a partir de concurrency conexões simultâneas.
+
+    Returns:
+        Vazão e latências vistas pelo cliente, junto com os contadores do /stats do serviço.
+    """
+    texts = texts or SAMPLE_TEXTS
+    latencies = []
+    per_client = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, texts, n, i * 997, latencies) for i, n in enumerate(per_client) if n))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'throughput_rps': len(latencies) / max(elapsed, 1e-9),
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p95_ms': float(np.percentile(latencies, 95)),
+        'latency_p99_ms': float(np.percentile(latencies, 99)),
+        'server': await _get(host, port, '/stats'),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gerador de carga para o scoring_service rodando localmente.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2_000)
+    parser.add_argument('--source', default=None, help='Tabela do catálogo com review_comment_message (padrão: textos de exemplo).')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.host, args.port, args.concurrency, args.requests, load_texts(args.source)))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.scoring_service &
+# python -m notebooks.scoring_loadgen --concurrency 64 --requests 10000 --source order_reviews
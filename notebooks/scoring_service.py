@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from notebooks import model_registry
+from notebooks.pipeline_timing import instrument, timings
+from notebooks.sentiment import set_store
+
+class MicroBatcher:
+    """
+    Junta previsões pedidas ao mesmo tempo em um único predict_proba.
+
+    Um lote é fechado quando chega a max_batch_size textos ou quando o primeiro texto do lote
+    esperou max_wait_ms. O pipeline roda em uma thread, sem travar o loop do asyncio.
+    """
+    def __init__(self, model, max_batch_size : int=64, max_wait_ms : float=5.0, latency_window : int=10_000):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = asyncio.Queue()
+        self._task = None
+        self._started = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.batch_sizes = deque(maxlen=latency_window)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def predict(self, text : str) -> tuple:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(('' if text is None else text, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _, _ in batch]
+            try:
+                proba = await loop.run_in_executor(None, self.model.predict_proba, texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            labels = self.model.classes_[proba.argmax(axis=1)]
+            now = time.perf_counter()
+            for (_, future, queued_at), label, row in zip(batch, labels, proba):
+                self.latencies.append(now - queued_at)
+                if not future.done():
+                    future.set_result((label.item(), row.tolist()))
+            self.requests += len(batch)
+            self.batches += 1
+            self.batch_sizes.append(len(batch))
+
+    def stats(self) -> dict:
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        elapsed = time.perf_counter() - self._started
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            'uptime_s': elapsed,
+            'throughput_rps': self.requests / max(elapsed, 1e-9),
+            'latency_p50_ms': float(np.percentile(latencies, 50)),
+            'latency_p95_ms': float(np.percentile(latencies, 95)),
+            'latency_p99_ms': float(np.percentile(latencies, 99)),
+            'queue_size': self._queue.qsize(),
+        }
+
+# Servidor HTTP/1.1 mínimo (sem dependências), com keep-alive
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return method, path, headers, body
+
+def _response(status : int, payload : dict, keep_alive : bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (f'HTTP/1.1 {status} {_REASONS[status]}\r\n'
+            'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+    return head.encode('latin-1') + body
+
+async def _route(batcher : MicroBatcher, method : str, path : str, body : bytes) -> tuple:
+    if path == '/health':
+        return 200, {'status': 'ok'}
+    if path == '/stats':
+        return 200, {**batcher.stats(), 'stages': timings.summary().to_dict(orient='records')}
+    if path != '/predict':
+        return 404, {'error': f'Rota {path} não existe. Use /predict, /stats ou /health.'}
+    if method != 'POST':
+        return 405, {'error': 'Use POST em /predict.'}
+
+    try:
+        payload = json.loads(body or b'{}')
+    except json.JSONDecodeError:
+        return 400, {'error': 'O corpo deve ser um JSON com "text" ou "texts".'}
+    if not isinstance(payload, dict):
+        return 400, {'error': 'O corpo deve ser um objeto JSON com "text" ou "texts".'}
+    texts = payload['texts'] if 'texts' in payload else [payload.get('text')]
+    if not isinstance(texts, list):
+        return 400, {'error': '"texts" deve ser uma lista.'}
+    # Um valor inválido derrubaria o lote inteiro (e as requisições de outros clientes junto), então é
+    # recusado aqui, antes de entrar na fila
+    if not all(text is None or isinstance(text, str) for text in texts):
+        return 400, {'error': 'Cada texto deve ser uma string ou null.'}
+
+    results = await asyncio.gather(*(batcher.predict(text) for text in texts))
+    return 200, {
+        'classes': batcher.model.classes_.tolist(),
+        'predictions': [label for label, _ in results],
+        'probabilities': [proba for _, proba in results],
+    }
+
+def _handler(batcher : MicroBatcher):
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    writer.write(_response(400, {'error': 'Requisição HTTP inválida.'}, False))
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', 'keep-alive').lower() != 'close'
+                try:
+                    status, payload = await _route(batcher, method, path, body)
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    return handle
+
+async def serve(model_name : str='satisfaction_rf', host : str='127.0.0.1', port : int=8765,
+        max_batch_size : int=64, max_wait_ms : float=5.0):
+    # Textos recebidos pelo serviço não vão para a loja de sentimentos
+    model = instrument(set_store(model_registry.load_model(model_name), False))
+    batcher = MicroBatcher(model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    batcher.start()
+    server = await asyncio.start_server(_handler(batcher), host, port)
+    print(f'Servindo {model_name} em http://{host}:{port} (lote máx. {max_batch_size}, espera máx. {max_wait_ms} ms)')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serviço HTTP local do modelo de satisfação, com micro-lotes.')
+    parser.add_argument('--model', default='satisfaction_rf')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.model, args.host, args.port, args.max_batch_size, args.max_wait_ms))
+    except KeyboardInterrupt:
+        pass
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.scoring_service --max-batch-size 128 --max-wait-ms 10
+# curl -X POST localhost:8765/predict -d '{"text": "Chegou antes do prazo"}'
+# curl localhost:8765/stats
@@ -0,0 +1,176 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import FeatureUnion, Pipeline
+from sklearn.preprocessing import FunctionTransformer
+from LeIA import SentimentIntensityAnalyzer
+
+# Ordem das colunas devolvidas pelo SentimentAnalyzer (a mesma do DataFrame dos notebooks)
+SCORE_COLUMNS = ['comp_score', 'neg', 'pos', 'neu']
+_SCORE_KEYS = ['compound', 'neg', 'pos', 'neu']
+
+def identity(X):
+    return X
+
+# Analisador de cada worker do pool, criado uma vez por processo
+_worker_analyzer = None
+
+def _score_chunk(texts) -> np.ndarray:
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = SentimentIntensityAnalyzer()
+    return _polarity_matrix(_worker_analyzer, texts)
+
+def _polarity_matrix(analyzer, texts) -> np.ndarray:
+    scores = np.empty((len(texts), len(_SCORE_KEYS)), dtype=np.float32)
+    for i, text in enumerate(texts):
+        s = analyzer.polarity_scores(text)
+        scores[i] = [s[key] for key in _SCORE_KEYS]
+    return scores
+
+class SentimentAnalyzer(BaseEstimator, TransformerMixin):
+    """
+    Scores do LeIA (comp_score, neg, pos, neu e, opcionalmente, polarity) como matriz float32.
+
+    Textos repetidos no lote são pontuados uma vez e os scores ficam em um cache LRU de até
+    cache_size textos. Com store=True, os textos fora do cache são buscados na loja persistente
+    (sentiment_store) e só os inéditos passam pelo LeIA. Lotes com mais de parallel_threshold
+    textos novos são divididos entre n_jobs processos. Modelos salvos com a versão antiga da classe
+    (só com o atributo analyzer) continuam abrindo: os parâmetros novos assumem os valores padrão.
+
+    Args:
+        polarity: Adiciona a coluna polarity (1, -1 ou 0, pelo sinal do comp_score).
+        cache_size: Máximo de textos guardados no cache (0 desliga o cache).
+        n_jobs: Processos para lotes grandes (None ou 1 roda no processo atual, -1 usa todos os núcleos).
+        parallel_threshold: Mínimo de textos novos no lote para usar os processos.
+        store: Lê e grava os scores na loja persistente do LeIA.
+    """
+    def __init__(self, polarity=False, cache_size=100_000, n_jobs=None, parallel_threshold=20_000, store=False):
+        self.polarity = polarity
+        self.cache_size = cache_size
+        self.n_jobs = n_jobs
+        self.parallel_threshold = parallel_threshold
+        self.store = store
+        self.analyzer = SentimentIntensityAnalyzer()
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop('_cache', None)
+        state.pop('_cache_lock', None)
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        for param, default in [('polarity', False), ('cache_size', 100_000), ('n_jobs', None), ('parallel_threshold', 20_000), ('store', False)]:
+            self.__dict__.setdefault(param, default)
+
+    def fit(self, X, y=None):
+        return self
+
+    def __sklearn_is_fitted__(self):
+        # Não aprende nada no fit; sem isso o check_is_fitted das versões novas do sklearn recusa o pipeline
+        return True
+
+    def _score(self, texts) -> np.ndarray:
+        if self.store:
+            from notebooks.sentiment_store import get_store
+            return get_store('leia').scores(texts, score_fn=self._analyze)
+        return self._analyze(texts)
+
+    def _analyze(self, texts) -> np.ndarray:
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+        if not n_jobs or n_jobs == 1 or len(texts) < self.parallel_threshold:
+            return _polarity_matrix(self.analyzer, texts)
+        chunks = np.array_split(np.asarray(texts, dtype=object), n_jobs * 4)
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            return np.vstack(list(executor.map(_score_chunk, [chunk.tolist() for chunk in chunks])))
+
+    def transform(self, X):
+        codes, uniques = pd.factorize(pd.Series(list(X), dtype=object), use_na_sentinel=False)
+        cache = self.__dict__.setdefault('_cache', OrderedDict())
+        # O pipeline da página é compartilhado entre as sessões do streamlit (threads diferentes);
+        # o lock protege o cache, mas a pontuação dos textos novos roda fora dele
+        lock = self.__dict__.setdefault('_cache_lock', threading.Lock())
+
+        unique_scores = np.empty((len(uniques), len(_SCORE_KEYS)), dtype=np.float32)
+        missing = []
+        with lock:
+            for i, text in enumerate(uniques):
+                cached = cache.get(text)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    cache.move_to_end(text)
+                    unique_scores[i] = cached
+
+        if missing:
+            unique_scores[missing] = self._score([uniques[i] for i in missing])
+            if self.cache_size:
+                with lock:
+                    for i in missing:
+                        cache[uniques[i]] = unique_scores[i]
+                    while len(cache) > self.cache_size:
+                        cache.popitem(last=False)
+
+        scores = unique_scores[codes]
+        if self.polarity:
+            scores = np.hstack([scores, np.sign(scores[:, :1])])
+        return scores
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(SCORE_COLUMNS + (['polarity'] if self.polarity else []), dtype=object)
+
+def set_store(estimator, enabled : bool=True):
+    # Liga ou desliga a loja persistente em todos os SentimentAnalyzer de um pipeline já montado ou carregado
+    for value in [estimator, *estimator.get_params(deep=True).values()]:
+        if isinstance(value, SentimentAnalyzer):
+            value.store = enabled
+    return estimator
+
+def create_pipeline(store=False):
+    features = FeatureUnion([
+        ('sentiment', Pipeline([
+            ('extract', FunctionTransformer(identity, validate=False)),
+            ('analyzer', SentimentAnalyzer(store=store))
+        ])),
+        ('tfidf', TfidfVectorizer(max_features=1000))
+    ])
+
+    pipeline = Pipeline([
+        ('features', features),
+        ('clf', RandomForestClassifier(n_estimators=100, random_state=42))
+    ])
+
+    return pipeline
+
+def create_compact_pipeline(store=False, n_features=2**16):
+    # Alternativa leve ao create_pipeline: sem vocabulário (hashing) e um modelo linear no lugar das 100 árvores
+    features = FeatureUnion([
+        ('sentiment', Pipeline([
+            ('extract', FunctionTransformer(identity, validate=False)),
+            ('analyzer', SentimentAnalyzer(store=store))
+        ])),
+        ('tfidf', Pipeline([
+            ('hashing', HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None, dtype=np.float32)),
+            ('idf', TfidfTransformer())
+        ]))
+    ])
+
+    pipeline = Pipeline([
+        ('features', features),
+        ('clf', LogisticRegression(max_iter=1000))
+    ])
+
+    return pipeline
+
+# ----------- EXEMPLO DE USO -----------
+# from notebooks.sentiment import SentimentAnalyzer, identity, create_pipeline
+# SentimentAnalyzer().transform(['Produto chegou antes do prazo', 'Não recebi o produto'])
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from notebooks import data_catalog
+
+# Um diretório por analisador, com arquivos parquet só de acréscimo (text_hash + scores)
+STORE_DIR = data_catalog.DATA_DIR / 'outputs' / 'sentiment_store'
+
+SCORE_KEYS = ['compound', 'neg', 'pos', 'neu']
+
+# Quantidade de arquivos a partir da qual os acréscimos são juntados em um só
+MAX_PARTS = 32
+
+def _leia():
+    from LeIA import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+def _vader():
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+ANALYZERS = {
+    'leia': _leia,
+    'vader': _vader,
+}
+
+def text_hash(text : str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+class SentimentStore:
+    """
+    Scores de sentimento persistidos em disco, chaveados pelo hash do texto e pelo nome do analisador.
+    Cada texto é pontuado uma única vez; as chamadas seguintes (em qualquer processo) leem do disco.
+    """
+    def __init__(self, analyzer : str='leia'):
+        if analyzer not in ANALYZERS:
+            raise KeyError(f"O analisador '{analyzer}' não existe. Analisadores disponíveis: {sorted(ANALYZERS)}")
+        self.name = analyzer
+        self.path = STORE_DIR / analyzer
+        self._analyzer = None
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = pd.Index([], dtype=object)
+        self._scores = np.empty((0, len(SCORE_KEYS)), dtype=np.float32)
+
+    def _parts(self) -> list:
+        return sorted(self.path.glob('part-*.parquet')) if self.path.exists() else []
+
+    def _refresh(self):
+        # Relê o diretório só quando outro processo acrescentou arquivos
+        parts = self._parts()
+        version = tuple(part.name for part in parts)
+        if version == self._version:
+            return
+        if parts:
+            try:
+                table = pa.concat_tables([pq.read_table(part) for part in parts])
+            except FileNotFoundError:
+                # Outro processo compactou a loja durante a leitura
+                return self._refresh()
+            df = table.to_pandas().drop_duplicates('text_hash')
+            self._index = pd.Index(df['text_hash'].to_numpy(dtype=object))
+            self._scores = df[SCORE_KEYS].to_numpy(dtype=np.float32)
+        else:
+            self._index = pd.Index([], dtype=object)
+            self._scores = np.empty((0, len(SCORE_KEYS)), dtype=np.float32)
+        self._version = version
+
+    def _score_texts(self, texts) -> np.ndarray:
+        if self._analyzer is None:
+            self._analyzer = ANALYZERS[self.name]()
+        scores = np.empty((len(texts), len(SCORE_KEYS)), dtype=np.float32)
+        for i, text in enumerate(texts):
+            s = self._analyzer.polarity_scores(text)
+            scores[i] = [s[key] for key in SCORE_KEYS]
+        return scores
+
+    def _append(self, hashes : list, scores : np.ndarray):
+        self.path.mkdir(parents=True, exist_ok=True)
+        table = pa.table({'text_hash': pa.array(hashes, pa.string()),
+                          **{key: pa.array(scores[:, i]) for i, key in enumerate(SCORE_KEYS)}})
+        # Nome único por escrita: processos diferentes podem acrescentar ao mesmo tempo
+        part = self.path / f'part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet'
+        tmp_path = part.with_suffix('.tmp')
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, part)
+        return part
+
+    def scores(self, texts, score_fn=None) -> np.ndarray:
+        """
+        Scores (compound, neg, pos, neu) de cada texto, como matriz float32.
+
+        Args:
+            texts: Lista de textos. Nulos recebem NaN e não são guardados.
+            score_fn: Função opcional que pontua uma lista de textos novos (padrão: o analisador da loja).
+        """
+        texts = pd.Series(list(texts), dtype=object)
+        codes, uniques = pd.factorize(texts, use_na_sentinel=True)
+        hashes = [text_hash(text) for text in uniques]
+
+        with self._lock:
+            self._refresh()
+            positions = self._index.get_indexer(hashes)
+            missing = np.flatnonzero(positions < 0)
+            unique_scores = np.empty((len(uniques), len(SCORE_KEYS)), dtype=np.float32)
+            unique_scores[positions >= 0] = self._scores[positions[positions >= 0]]
+
+            if len(missing):
+                new_texts = [uniques[i] for i in missing]
+                new_scores = np.asarray((score_fn or self._score_texts)(new_texts), dtype=np.float32)
+                unique_scores[missing] = new_scores
+                new_hashes = [hashes[i] for i in missing]
+                part = self._append(new_hashes, new_scores)
+                self._index = self._index.append(pd.Index(new_hashes, dtype=object))
+                self._scores = np.vstack([self._scores, new_scores])
+                # Só o arquivo recém-escrito conta como lido; arquivos de outros processos que ainda não
+                # foram lidos deixam a versão diferente da listagem, e o próximo _refresh os lê
+                self._version = tuple(sorted((self._version or ()) + (part.name,)))
+                if len(self._parts()) > MAX_PARTS:
+                    self._compact()
+
+        result = np.full((len(texts), len(SCORE_KEYS)), np.nan, dtype=np.float32)
+        result[codes >= 0] = unique_scores[codes[codes >= 0]]
+        return result
+
+    def frame(self, texts) -> pd.DataFrame:
+        return pd.DataFrame(self.scores(texts), columns=SCORE_KEYS)
+
+    def _compact(self):
+        # Junta os arquivos lidos do disco (não o índice em memória, que pode não ter os acréscimos de
+        # outros processos) e apaga só esses arquivos; o que for escrito enquanto isso fica para depois
+        parts = self._parts()
+        try:
+            table = pa.concat_tables([pq.read_table(part) for part in parts])
+        except FileNotFoundError:
+            # Outro processo compactou a loja ao mesmo tempo; a compactação dele já basta
+            self._version = None
+            return self._refresh()
+        df = table.to_pandas().drop_duplicates('text_hash')
+        self._append(df['text_hash'].tolist(), df[SCORE_KEYS].to_numpy(dtype=np.float32))
+        for part in parts:
+            part.unlink(missing_ok=True)
+        self._version = None
+        self._refresh()
+
+    def compact(self):
+        # Junta os acréscimos em um único arquivo
+        with self._lock:
+            if len(self._parts()) > 1:
+                self._compact()
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._index)
+
+# Uma instância por analisador em cada processo
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(analyzer : str='leia') -> SentimentStore:
+    with _stores_lock:
+        if analyzer not in _stores:
+            _stores[analyzer] = SentimentStore(analyzer)
+        return _stores[analyzer]
+
+# ----------- EXEMPLO DE USO -----------
+# store = get_store('vader')
+# compound = store.scores(df['review_comment_message'])[:, 0]
+# get_store('leia').frame(['Chegou antes do prazo', 'Produto com defeito'])
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from notebooks import data_catalog, model_comparison
+
+# Arrays de SHAP lidos pela página de Classificação
+SHAP_PATH = data_catalog.DATA_DIR / 'outputs' / 'shap_random_forest.npz'
+
+# Classes do review_score_factor, como na página
+CLASS_NAMES = {0: 'Negativo', 1: 'Neutro', 2: 'Positivo'}
+
+def stratified_sample(y, n : int, random_state : int=model_comparison.SEED) -> np.ndarray:
+    # Índices de n linhas com a mesma proporção de classes de y, em ordem aleatória
+    # (qualquer prefixo da amostra também fica próximo da proporção original)
+    if n >= len(y):
+        return np.random.default_rng(random_state).permutation(len(y))
+    index, _ = train_test_split(np.arange(len(y)), train_size=n, stratify=y, random_state=random_state)
+    return index
+
+def _explainer(model, background=None):
+    try:
+        import shap
+    except ImportError:
+        raise ImportError('O cálculo dos valores SHAP precisa do pacote shap (pip install shap).') from None
+
+    if background is None:
+        return shap.TreeExplainer(model)
+    return shap.TreeExplainer(model, data=background, feature_perturbation='interventional')
+
+def _shap_values(explainer, X) -> np.ndarray:
+    values = explainer.shap_values(X, check_additivity=False)
+    # Versões antigas do shap devolvem uma lista (uma matriz por classe); as novas, (amostras, features, classes)
+    if isinstance(values, list):
+        values = np.stack(values, axis=-1)
+    return values.astype(np.float32)
+
+# Explainer de cada worker, criado uma vez por processo
+_worker_explainer = None
+
+def _init_worker(model, background):
+    global _worker_explainer
+    _worker_explainer = _explainer(model, background)
+
+def _explain_chunk(X) -> np.ndarray:
+    return _shap_values(_worker_explainer, X)
+
+def tree_shap(model, X, background=None, n_jobs : int=None) -> tuple:
+    """
+    Valores SHAP (amostras, features, classes) em float32 e o valor base de cada classe.
+    Com n_jobs > 1, as linhas são divididas em blocos explicados em processos separados.
+    """
+    explainer = _explainer(model, background)
+    base_values = np.atleast_1d(explainer.expected_value).astype(np.float32)
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    if not n_jobs or n_jobs == 1 or len(X) < 2 * n_jobs:
+        return _shap_values(explainer, X), base_values
+
+    chunks = np.array_split(X, n_jobs * 4)
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(model, background)) as executor:
+        return np.concatenate(list(executor.map(_explain_chunk, chunks))), base_values
+
+def compute(source : str='score_df_3', n_samples : int=2_000, n_background : int=100, n_jobs : int=-1,
+        save : bool=True, verbose : bool=False) -> dict:
+    """
+    Treina a Random Forest da comparação (mesmo split 80/20) e calcula os valores SHAP (TreeSHAP)
+    de uma amostra estratificada do conjunto de teste. Os arrays são gravados em float32 em
+    SHAP_PATH para a página montar os gráficos sem rodar o explainer.
+
+    Args:
+        source: Tabela do catálogo com as features.
+        n_samples: Linhas de teste explicadas (amostra estratificada pela classe).
+        n_background: Linhas de treino (amostra estratificada pela classe) usadas como referência do
+            TreeSHAP interventional. Com 0, usa os caminhos das árvores (tree_path_dependent): mais rápido,
+            mas sem amostra de referência.
+        n_jobs: Processos usados pelo explainer e núcleos da floresta (-1 usa todos).
+        save: Grava o arquivo .npz.
+
+    Returns:
+        Dicionário com values (amostras, features, classes), data, target, base_values, columns e classes.
+    """
+    data = model_comparison.load_features(source, verbose=verbose)
+    X, y = data['X'], data['target']
+    train_idx, test_idx = model_comparison.split_indices(len(y))
+
+    model = model_comparison.CANDIDATES['Random Forest'](n_jobs)
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - start
+
+    sample = test_idx[stratified_sample(y[test_idx], n_samples)]
+    background = X[train_idx[stratified_sample(y[train_idx], n_background)]] if n_background else None
+
+    start = time.perf_counter()
+    model.set_params(n_jobs=None)
+    values, base_values = tree_shap(model, X[sample], background, n_jobs=n_jobs)
+    shap_time = time.perf_counter() - start
+
+    artifact = {
+        'values': values,
+        'data': X[sample].astype(np.float32),
+        'target': y[sample].astype(np.int8),
+        'base_values': base_values,
+        'columns': np.array(data['columns']),
+        'classes': model.classes_.astype(np.int8),
+        'meta': np.array(json.dumps({
+            'source': source, 'data_fingerprint': data_catalog.table_fingerprint(source),
+            'n_samples': len(sample), 'n_background': n_background,
+            'fit_s': fit_time, 'shap_s': shap_time,
+        })),
+    }
+
+    if save:
+        # Escreve em um arquivo temporário e troca no final, para a página nunca ler um .npz pela metade
+        tmp_path = SHAP_PATH.with_name(f'{SHAP_PATH.stem}.tmp.npz')
+        np.savez(tmp_path, **artifact)
+        os.replace(tmp_path, SHAP_PATH)
+
+    if verbose:
+        size = sum(array.nbytes for array in artifact.values()) / 2**20
+        print(f'SHAP de {len(sample)} linhas x {X.shape[1]} features em {shap_time:.2f}s (treino {fit_time:.2f}s, {size:.1f} MB)')
+    return artifact
+
+def load(path=SHAP_PATH) -> dict:
+    with np.load(path) as arrays:
+        artifact = {name: arrays[name] for name in arrays.files}
+    artifact['columns'] = artifact['columns'].tolist()
+    artifact['meta'] = json.loads(artifact['meta'].item())
+    return artifact
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calcula os valores SHAP da Random Forest para a página de Classificação.')
+    parser.add_argument('--source', default='score_df_3', help='Tabela do catálogo com as features.')
+    parser.add_argument('--n-samples', type=int, default=2_000, help='Linhas de teste explicadas.')
+    parser.add_argument('--n-background', type=int, default=100, help='Linhas de treino usadas como referência (0: caminhos das árvores).')
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    compute(args.source, n_samples=args.n_samples, n_background=args.n_background, n_jobs=args.n_jobs, verbose=True)
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.shap_artifacts --n-samples 5000
+# artifact = load()
+# artifact['values'][:, :, 2]   (valores SHAP da classe Positivo)
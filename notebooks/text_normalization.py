@@ -0,0 +1,164 @@
+import argparse
+import hashlib
+import os
+import string
+import time
+import unicodedata
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from notebooks import data_catalog
+
+# Recursos do NLTK carregados uma vez por processo (no processo principal e em cada worker)
+_resources = {}
+
+LEMMA_CACHE_SIZE = 200_000
+
+def download_nltk_resources():
+    import nltk
+    for resource in ['punkt', 'stopwords', 'wordnet']:
+        nltk.download(resource, quiet=True)
+
+def _load_resources():
+    if not _resources:
+        from nltk.corpus import stopwords
+        from nltk.stem import WordNetLemmatizer
+        from nltk.tokenize import word_tokenize
+        _resources['stop_words'] = frozenset(stopwords.words('portuguese'))
+        _resources['punctuation'] = str.maketrans('', '', string.punctuation)
+        _resources['tokenize'] = word_tokenize
+        _resources['lemmatize'] = lru_cache(maxsize=LEMMA_CACHE_SIZE)(WordNetLemmatizer().lemmatize)
+    return _resources
+
+def lemmatize_text(text) -> str:
+    # Mesmo resultado do preprocess_text de topicos_chave_das_reviews_dos_clientes.py
+    if text is None:
+        return ''
+    resources = _load_resources()
+    text = text.lower().translate(resources['punctuation'])
+    tokens = resources['tokenize'](text, language='portuguese')
+    lemmatize, stop_words = resources['lemmatize'], resources['stop_words']
+    return ' '.join(lemmatize(word) for word in tokens if word not in stop_words)
+
+def clean_text(text) -> str:
+    # Mesmo resultado do preprocess_text do normalizing_reviews.ipynb
+    if text is None:
+        return ''
+    text = text.lower()
+    return ''.join(c for c in text if not unicodedata.category(c).startswith('P'))
+
+MODES = {
+    'lemmas': lemmatize_text,
+    'clean': clean_text,
+}
+
+def normalize_texts(texts, mode : str='lemmas') -> list:
+    """
+    Normaliza uma lista de textos, processando cada texto distinto uma única vez.
+
+    Args:
+        texts: Iterável de textos (None vira '').
+        mode: 'lemmas' (minúsculas, sem pontuação e stopwords, lematizado) ou 'clean' (minúsculas, sem pontuação).
+    """
+    normalize = MODES[mode]
+    texts = pd.Series(texts, dtype=object)
+    codes, uniques = pd.factorize(texts, use_na_sentinel=True)
+    normalized = [normalize(text) for text in uniques]
+    empty = normalize(None)
+    return [normalized[code] if code >= 0 else empty for code in codes]
+
+def normalize_series(series : pd.Series, mode : str='lemmas') -> pd.Series:
+    return pd.Series(normalize_texts(series, mode=mode), index=series.index, name=series.name)
+
+def _normalize_batch(args) -> list:
+    texts, mode = args
+    return normalize_texts(texts, mode=mode)
+
+def source_fingerprint(source : str, column : str, mode : str) -> str:
+    parts = [data_catalog.table_fingerprint(source), column, mode]
+    return hashlib.blake2b('|'.join(parts).encode(), digest_size=16).hexdigest()
+
+def is_stale(source : str='order_reviews', column : str='review_comment_message', output : str='order_reviews_normalized',
+        mode : str='lemmas') -> bool:
+    # True quando a tabela normalizada não existe ou foi gerada a partir de outra versão da entrada
+    path = data_catalog.table_path(output)
+    if not path.exists():
+        return True
+    stored = (pq.read_schema(path).metadata or {}).get(data_catalog.FINGERPRINT_KEY)
+    return stored is None or stored.decode() != source_fingerprint(source, column, mode)
+
+def normalize_table(source : str='order_reviews', column : str='review_comment_message', output : str='order_reviews_normalized',
+        output_column : str='processed_review', mode : str='lemmas', batch_size : int=20_000, n_jobs : int=None,
+        force : bool=False, verbose : bool=False):
+    """
+    Lê a tabela em lotes, normaliza a coluna de texto em um pool de processos e grava a tabela
+    com a coluna normalizada em output. Não faz nada se a entrada não mudou desde a última execução.
+
+    Returns:
+        O caminho do parquet gerado.
+    """
+    path = data_catalog.table_path(output)
+    fingerprint = source_fingerprint(source, column, mode)
+    if not force and not is_stale(source, column, output, mode):
+        if verbose:
+            print(f'{output}: atualizado ({fingerprint})')
+        return path
+
+    if mode == 'lemmas':
+        download_nltk_resources()
+
+    start = time.perf_counter()
+    source_file = pq.ParquetFile(data_catalog.table_path(source))
+    schema = source_file.schema_arrow.append(pa.field(output_column, pa.string()))
+    schema = schema.with_metadata({**(schema.metadata or {}), data_catalog.FINGERPRINT_KEY: fingerprint.encode()})
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Nome único por escrita: duas execuções ao mesmo tempo não escrevem no mesmo arquivo temporário
+    tmp_path = path.with_name(f'{path.stem}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}')
+    n_jobs = n_jobs or os.cpu_count()
+    rows = 0
+
+    def write(batch, future):
+        table = pa.Table.from_batches([batch]).append_column(output_column, pa.array(future.result(), pa.string()))
+        writer.write_table(table.cast(schema))
+        return batch.num_rows
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor, pq.ParquetWriter(tmp_path, schema) as writer:
+        # Só alguns lotes ficam em memória ao mesmo tempo; a escrita segue a ordem de leitura
+        pending = deque()
+        for batch in source_file.iter_batches(batch_size=batch_size):
+            pending.append((batch, executor.submit(_normalize_batch, (batch.column(column).to_pylist(), mode))))
+            if len(pending) >= 2 * n_jobs:
+                rows += write(*pending.popleft())
+        while pending:
+            rows += write(*pending.popleft())
+    os.replace(tmp_path, path)
+
+    if verbose:
+        elapsed = time.perf_counter() - start
+        print(f'{output}: {rows} linhas normalizadas em {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} linhas/s)')
+    return path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Normaliza os textos das reviews em lotes, usando vários processos.')
+    parser.add_argument('--source', default='order_reviews')
+    parser.add_argument('--column', default='review_comment_message')
+    parser.add_argument('--output', default='order_reviews_normalized')
+    parser.add_argument('--mode', choices=list(MODES), default='lemmas')
+    parser.add_argument('--batch-size', type=int, default=20_000)
+    parser.add_argument('--jobs', type=int, default=None, help='Número de processos (padrão: todos os núcleos).')
+    parser.add_argument('--force', action='store_true', help='Normaliza mesmo que a entrada não tenha mudado.')
+    args = parser.parse_args()
+
+    normalize_table(args.source, args.column, args.output, mode=args.mode, batch_size=args.batch_size,
+                    n_jobs=args.jobs, force=args.force, verbose=True)
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.text_normalization
+# df['processed_review'] = normalize_series(df['review_comment_message'])
@@ -1,18 +1,138 @@
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+def _factorize(series : pd.Series) -> tuple:
+    try:
+        return pd.factorize(series, use_na_sentinel=True)
+    except TypeError:
+        # Valores não hasheáveis (listas, arrays) são comparados pela representação em texto
+        return pd.factorize(series.astype(str), use_na_sentinel=True)
+
+def profile_column(series : pd.Series, n_samples : int=3, factorized : tuple=None) -> dict:
+    """
+    Perfil de uma coluna em uma única passada: o pd.factorize gera os códigos e os valores únicos,
+    e nulos, zeros, negativos, únicos e entropia saem da contagem desses códigos.
+
+    Args:
+        factorized: (códigos, únicos) já calculados pelo pd.factorize da coluna, para não repetir a passada.
+    """
+    codes, uniques = factorized if factorized is not None else _factorize(series)
+
+    n_rows = len(series)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    nulls = n_rows - counts.sum()
+
+    zeros = negatives = 0
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        values = np.asarray(uniques, dtype='float64')
+        zeros = counts[values == 0].sum()
+        negatives = counts[values < 0].sum()
+
+    probabilities = counts[counts > 0] / max(counts.sum(), 1)
+    entropy = float(-(probabilities * np.log2(probabilities)).sum()) + 0.0
+
+    profile = {
+        'Nome': series.name,
+        'Tipo': series.dtype,
+        'Ausentes': nulls,
+        'Ausentes (%)': nulls / max(n_rows, 1) * 100,
+        'Zeros (%)': zeros / max(n_rows, 1) * 100,
+        'Negativos (%)': negatives / max(n_rows, 1) * 100,
+        'Únicos': len(uniques),
+        'Entropia': entropy,
+    }
+    for position, label in enumerate(['Primeiro Valor', 'Segundo Valor', 'Terceiro Valor'][:n_samples]):
+        profile[label] = series.iloc[position] if position < n_rows else None
+    return profile
+
+_profile_cache = {}
+
+def profile_dataframe(dataFrame : pd.DataFrame, parallel : bool=False, n_jobs : int=None, fingerprint : str=None) -> pd.DataFrame:
+    """
+    Resumo de todas as colunas do DataFrame (base do visualize_data, do resumo da Análise Exploratória e do skimming_data).
+
+    Args:
+        dataFrame: DataFrame a ser resumido.
+        parallel: Calcula as colunas em paralelo com threads.
+        n_jobs: Número de threads do modo paralelo. None usa o padrão do ThreadPoolExecutor.
+        fingerprint: Impressão digital dos dados (ex.: data_catalog.table_fingerprint). Quando informada,
+            o resumo fica guardado no processo e é reaproveitado enquanto os dados não mudarem.
+    """
+    key = (fingerprint, tuple(dataFrame.columns))
+    if fingerprint is not None and key in _profile_cache:
+        return _profile_cache[key]
+
+    columns = [dataFrame[col] for col in dataFrame.columns]
+    if parallel:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            profiles = list(executor.map(profile_column, columns))
+    else:
+        profiles = [profile_column(col) for col in columns]
+
+    resumo = pd.DataFrame(profiles)
+    resumo['Entropia'] = resumo['Entropia'].round(2)
+    if fingerprint is not None:
+        _profile_cache[key] = resumo
+    return resumo
+
+def count_duplicates(codes : list, n_rows : int) -> int:
+    """
+    Linhas duplicadas (o mesmo que DataFrame.duplicated().sum()) a partir dos códigos do pd.factorize
+    de cada coluna: os códigos são combinados coluna a coluna em um único código por linha.
+    """
+    if n_rows == 0:
+        return 0
+    combined = np.zeros(n_rows, dtype=np.int64)
+    for column_codes in codes:
+        # Nulos (-1) viram o código 0, como no duplicated(), que trata NaN como igual a NaN
+        combined, _ = pd.factorize(combined * (int(column_codes.max()) + 2) + (column_codes + 1))
+    return n_rows - (int(combined.max()) + 1)
+
+def unique_values(series : pd.Series, codes : np.ndarray):
+    """
+    O mesmo que series.unique() (ordem de aparição, com o nulo onde aparece pela primeira vez), a partir
+    dos códigos do pd.factorize: só as linhas da primeira aparição de cada valor são lidas.
+    """
+    # Os códigos são dados em ordem de aparição: um valor novo aparece onde o máximo acumulado aumenta
+    positions = np.flatnonzero(np.diff(np.maximum.accumulate(codes), prepend=-1) > 0)
+    missing = np.flatnonzero(codes < 0)
+    if len(missing):
+        positions = np.insert(positions, np.searchsorted(positions, missing[0]), missing[0])
+    try:
+        return series.iloc[positions].unique()
+    except TypeError:
+        # Valores não hasheáveis: as linhas já são uma de cada valor
+        return series.iloc[positions].to_numpy()
+
+def profile_with_duplicates(dataFrame : pd.DataFrame, with_unique_values : bool=False) -> tuple:
+    """
+    Perfil das colunas (como profile_dataframe) e o total de linhas duplicadas, com um único
+    pd.factorize por coluna para os dois.
+
+    Args:
+        with_unique_values: Inclui a coluna 'Valores unicos' (os valores de cada coluna, como no unique()).
+    """
+    factorized = [_factorize(dataFrame[col]) for col in dataFrame.columns]
+    profile = pd.DataFrame([profile_column(dataFrame[col], factorized=codes_uniques)
+                            for col, codes_uniques in zip(dataFrame.columns, factorized)])
+    if with_unique_values:
+        profile['Valores unicos'] = [unique_values(dataFrame[col], codes) for col, (codes, _) in zip(dataFrame.columns, factorized)]
+    return profile, count_duplicates([codes for codes, _ in factorized], len(dataFrame))
 
 def visualize_data(dataFrame):
+    profile, duplicates = profile_with_duplicates(dataFrame, with_unique_values=True)
     data = pd.DataFrame({
         'Fetaure': dataFrame.columns.values,
         'Tipo': dataFrame.dtypes.values,
-        'Nulos (%)': dataFrame.isna().mean().values * 100,
-        'Negativos (%)': [len(dataFrame[col][dataFrame[col] < 0]) / len(dataFrame) * 100 if col in dataFrame.select_dtypes(include=[np.number]).columns else 0 for col in dataFrame.columns],
-        'Zeros (%)': [len(dataFrame[col][dataFrame[col] == 0]) / len(dataFrame) * 100 if col in dataFrame.select_dtypes(include=[np.number]).columns else 0 for col in dataFrame.columns], 
-        'Duplicados': dataFrame.duplicated().sum(),
-        'Unicos': dataFrame.nunique().values,
-        'Valores unicos': [dataFrame[col].unique() for col in dataFrame.columns]
+        'Nulos (%)': profile['Ausentes (%)'],
+        'Negativos (%)': profile['Negativos (%)'],
+        'Zeros (%)': profile['Zeros (%)'],
+        'Duplicados': duplicates,
+        'Unicos': profile['Únicos'],
+        'Valores unicos': profile['Valores unicos']
     })
-    
+
     return data.round(2)
 
 translations = {
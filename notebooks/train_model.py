@@ -0,0 +1,144 @@
+import argparse
+import json
+import platform
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+
+from notebooks import data_catalog, feature_cache, model_registry
+from notebooks.satisfaction_training import load_training_data, save_model
+from notebooks.sentiment import SCORE_COLUMNS, create_pipeline
+
+def text_features_key(source : str, text_column : str, target : str, features) -> str:
+    # Só os parâmetros que mudam as matrizes entram na chave (n_jobs e a loja de sentimentos não mudam).
+    # As versões do sklearn e do numpy também entram: o FeatureUnion ajustado é guardado em joblib
+    tfidf = features.get_params()['tfidf'].get_params()
+    analyzer = features.get_params(deep=True)['sentiment__analyzer']
+    return feature_cache.cache_key(data_catalog.table_fingerprint(source), text_column, target,
+                                   sorted(tfidf.items()), SCORE_COLUMNS, analyzer.polarity,
+                                   sklearn.__version__, np.__version__)
+
+def text_features(source : str='score_df_3', text_column : str='review_comment_message', target : str='review_score',
+        n_jobs : int=None, store : bool=True, force : bool=False, verbose : bool=False) -> tuple:
+    """
+    TF-IDF (esparso) e scores do LeIA de todas as reviews da tabela, com o FeatureUnion já ajustado.
+    O cálculo é feito uma vez por versão dos dados; os treinos seguintes leem as matrizes do disco.
+
+    Returns:
+        Dicionário com sentiment, tfidf, target e features, e um bool que indica se veio do cache.
+    """
+    features = create_pipeline(store=store).named_steps['features']
+    key = text_features_key(source, text_column, target, features)
+
+    def build():
+        X, y = load_training_data(source, text_column, target)
+        # Paralelismo em um nível só: os processos do LeIA (a parte cara); o FeatureUnion fica serial para
+        # não abrir um pool de processos dentro de outro
+        features.set_params(n_jobs=None, sentiment__analyzer__n_jobs=n_jobs)
+        matrix = features.fit_transform(X).tocsr()
+        # O artefato final prevê uma review por vez; processos extras ali só atrasariam
+        features.set_params(n_jobs=None, sentiment__analyzer__n_jobs=None)
+        n_sentiment = len(SCORE_COLUMNS)
+        return {
+            'sentiment': matrix[:, :n_sentiment].toarray().astype(np.float32),
+            'tfidf': matrix[:, n_sentiment:],
+            'target': y.to_numpy(),
+            'features': features,
+        }
+
+    return feature_cache.cached('text_rf', key, build, force=force, verbose=verbose)
+
+def feature_matrix(data : dict):
+    # Mesma matriz que o FeatureUnion entrega ao classificador (sentimento + TF-IDF)
+    return sp.hstack([np.asarray(data['sentiment']), data['tfidf']], format='csr')
+
+def train(source : str='score_df_3', n_jobs : int=-1, force_features : bool=False, save : bool=True,
+        verbose : bool=False, **params) -> tuple:
+    """
+    Treina o pipeline do create_pipeline (LeIA + TF-IDF + Random Forest) a partir das features em cache.
+    Mudar só os hiperparâmetros da floresta não recalcula o TF-IDF nem os scores de sentimento.
+
+    Args:
+        source: Tabela do catálogo usada no treino.
+        n_jobs: Processos para as features e núcleos para a floresta (-1 usa todos).
+        force_features: Recalcula as features mesmo com o cache válido.
+        save: Grava o modelo compactado (model_rf.pkl.gz) e o arquivo de metadados.
+        params: Hiperparâmetros do RandomForestClassifier (ex.: n_estimators=300, max_depth=40). Um n_jobs
+            aqui é ignorado: os núcleos vêm do argumento n_jobs.
+
+    Returns:
+        O pipeline treinado e os metadados do treino.
+    """
+    start = time.perf_counter()
+    data, cached = text_features(source, n_jobs=n_jobs, force=force_features, verbose=verbose)
+    features_time = time.perf_counter() - start
+
+    # n_jobs vem sempre do argumento da função (um n_jobs em params, ex.: vindo de um dicionário de
+    # hiperparâmetros, seria passado duas vezes ao set_params)
+    params = {name: value for name, value in params.items() if name != 'n_jobs'}
+    clf = clone(create_pipeline().named_steps['clf']).set_params(**params, n_jobs=n_jobs)
+    start = time.perf_counter()
+    clf.fit(feature_matrix(data), data['target'])
+    fit_time = time.perf_counter() - start
+    clf.set_params(n_jobs=None)
+
+    model = Pipeline([('features', data['features']), ('clf', clf)])
+    metadata = {
+        'model': 'satisfaction_rf',
+        'source': source,
+        'data_fingerprint': data_catalog.table_fingerprint(source),
+        'features_key': text_features_key(source, 'review_comment_message', 'review_score', data['features']),
+        'features_cached': cached,
+        'params': clf.get_params(),
+        'n_samples': int(data['tfidf'].shape[0]),
+        'n_features': int(data['tfidf'].shape[1] + data['sentiment'].shape[1]),
+        'classes': clf.classes_.tolist(),
+        'timings_s': {'features': features_time, 'fit': fit_time},
+        'versions': {'python': platform.python_version(), 'numpy': np.__version__, 'sklearn': sklearn.__version__},
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+    if save:
+        start = time.perf_counter()
+        path = save_model(model, 'rf')
+        metadata['timings_s']['save'] = time.perf_counter() - start
+        metadata['artifact'] = path.name
+        metadata['artifact_mb'] = path.stat().st_size / 2**20
+        with open(model_registry.model_path('satisfaction_rf', 'meta'), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2, default=str)
+
+    if verbose:
+        print(json.dumps(metadata, ensure_ascii=False, indent=2, default=str))
+    return model, metadata
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Treina o modelo de satisfação da página (model_rf.pkl.gz) com as features em cache.')
+    parser.add_argument('--source', default='score_df_3', help='Tabela do catálogo usada no treino.')
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--min-samples-leaf', type=int, default=1)
+    parser.add_argument('--max-features', default='sqrt')
+    parser.add_argument('--random-state', type=int, default=42)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--force-features', action='store_true', help='Recalcula o TF-IDF e os scores de sentimento.')
+    parser.add_argument('--no-save', action='store_true', help='Só treina, sem gravar o modelo.')
+    args = parser.parse_args()
+
+    # max_features aceita 'sqrt', 'log2', um inteiro (número de colunas) ou um decimal (fração das colunas)
+    max_features = args.max_features
+    if max_features.isdigit():
+        max_features = int(max_features)
+    elif max_features.replace('.', '', 1).isdigit():
+        max_features = float(max_features)
+    train(args.source, n_jobs=args.n_jobs, force_features=args.force_features, save=not args.no_save, verbose=True,
+          n_estimators=args.n_estimators, max_depth=args.max_depth, min_samples_leaf=args.min_samples_leaf,
+          max_features=max_features, random_state=args.random_state)
+
+# ----------- EXEMPLO DE USO -----------
+# python -m notebooks.train_model
+# python -m notebooks.train_model --n-estimators 300 --max-depth 40   (reaproveita as features do treino anterior)
@@ -1,8 +1,12 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import altair as alt
 import seaborn as sns
 import matplotlib.pyplot as plt
 from PIL import Image
+import notebooks.data_catalog as data_catalog
+import notebooks.shap_artifacts as shap_artifacts
 
 sns.set_theme(style="whitegrid")
 
@@ -10,13 +14,13 @@ sns.set_theme(style="whitegrid")
 def load_data(file_path):
     if file_path.endswith('.csv'):
         return pd.read_csv(file_path)
-    elif file_path.endswith('.parquet'):
-        return pd.read_parquet(file_path)
+    elif file_path in data_catalog.CATALOG:
+        return data_catalog.read_table(file_path)
     else:
-        raise ValueError("Formato de arquivo não suportado. Use '.csv' ou '.parquet'.")
+        raise ValueError("Formato de arquivo não suportado. Use '.csv' ou uma tabela do catálogo de dados.")
 
 # Carregar o arquivo de resultados
-df = load_data('./data/outputs/results.parquet')
+df = load_data('results')
 
 st.title('🔎 Classificação')
 st.subheader('Comparação de Modelos de Classificação')
@@ -32,7 +36,8 @@ selected_models = st.multiselect('Selecione os Modelos para Comparar', options=m
 set_options = df['Set'].unique()
 selected_set = st.selectbox('Selecione o Conjunto de Dados', options=set_options, index=0)
 
-filtered_df = df[(df['Model'].isin(selected_models)) & (df['Set'] == selected_set)]
+# Colunas de desvio padrão só existem nas linhas da validação cruzada
+filtered_df = df[(df['Model'].isin(selected_models)) & (df['Set'] == selected_set)].dropna(axis=1, how='all')
 
 # Mostrar métricas dos modelos
 metrics = ['Accuracy', 'Precision', 'Recall', 'F1']
@@ -126,24 +131,113 @@ else:
 
 st.subheader('SHAP para o Random Forest')
 
-# Cria duas colunas
-col1, col2 = st.columns(2)
+@st.cache_resource
+def load_shap(version):
+    # Recarrega só quando o arquivo gerado pelo shap_artifacts muda (version = data de modificação)
+    return shap_artifacts.load()
+
+def shap_frame(artifact, class_index, n_rows):
+    # Formato longo (linha x feature) da amostra escolhida, com o valor da feature normalizado por coluna
+    values = artifact['values'][:n_rows, :, class_index]
+    data = artifact['data'][:n_rows]
+    low, high = np.nanmin(data, axis=0), np.nanmax(data, axis=0)
+    scaled = (data - low) / np.where(high > low, high - low, 1)
+    n_features = len(artifact['columns'])
+    return pd.DataFrame({
+        'Feature': np.tile(artifact['columns'], n_rows),
+        'SHAP': values.ravel(),
+        'Valor': data.ravel(),
+        'Valor relativo': scaled.ravel(),
+        'Classe real': np.repeat([class_mapping.get(int(c), str(c)) for c in artifact['target'][:n_rows]], n_features),
+    })
+
+if shap_artifacts.SHAP_PATH.exists():
+    artifact = load_shap(shap_artifacts.SHAP_PATH.stat().st_mtime_ns)
+    class_mapping = shap_artifacts.CLASS_NAMES
+    class_labels = [class_mapping.get(int(c), str(c)) for c in artifact['classes']]
+    max_rows = len(artifact['target'])
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        selected_class = st.selectbox('Classe', options=class_labels, index=len(class_labels) - 1)
+    # O st.slider não aceita min_value == max_value: com amostra ou features de menos, usa todas
+    with col2:
+        if max_rows > 100:
+            n_rows = st.slider('Tamanho da amostra', min_value=100, max_value=max_rows, value=min(500, max_rows), step=100)
+        else:
+            n_rows = max_rows
+            st.caption(f'Tamanho da amostra: {max_rows} linhas')
+    with col3:
+        n_features = len(artifact['columns'])
+        if n_features > 3:
+            top_n = st.slider('Features exibidas', min_value=3, max_value=n_features, value=min(10, n_features))
+        else:
+            top_n = n_features
+            st.caption(f'Features exibidas: {n_features}')
+    class_index = class_labels.index(selected_class)
+
+    # Importância média |SHAP| de cada feature por classe (equivalente ao gráfico de barras multiclasse)
+    mean_abs = np.abs(artifact['values'][:n_rows]).mean(axis=0)
+    importance = pd.DataFrame(mean_abs, index=artifact['columns'], columns=class_labels)
+    order = importance.sum(axis=1).sort_values(ascending=False).index[:top_n].tolist()
+    bars = alt.Chart(importance.loc[order].rename_axis('Feature').reset_index().melt(id_vars='Feature', var_name='Classe', value_name='Importância')).mark_bar().encode(
+        x=alt.X('Importância:Q', title='Média |SHAP|'),
+        y=alt.Y('Feature:N', sort=order, title=None),
+        color=alt.Color('Classe:N', sort=class_labels),
+        tooltip=['Feature', 'Classe', alt.Tooltip('Importância:Q', format='.4f')]
+    ).properties(title='Importância média por classe', height=25 * top_n)
+
+    # Resumo da classe escolhida: cada ponto é uma linha da amostra, colorido pelo valor da feature
+    frame = shap_frame(artifact, class_index, n_rows)
+    class_order = importance[selected_class].sort_values(ascending=False).index[:top_n].tolist()
+    summary = alt.Chart(frame[frame['Feature'].isin(class_order)]).mark_circle(size=18, opacity=0.6).encode(
+        x=alt.X('SHAP:Q', title=f'Valor SHAP (impacto na classe {selected_class})'),
+        y=alt.Y('Feature:N', sort=class_order, title=None),
+        yOffset='jitter:Q',
+        color=alt.Color('Valor relativo:Q', scale=alt.Scale(scheme='redblue', reverse=True), title='Valor da feature'),
+        tooltip=['Feature', alt.Tooltip('Valor:Q', format='.3f'), alt.Tooltip('SHAP:Q', format='.4f'), 'Classe real']
+    ).transform_calculate(jitter='random()').properties(title=f'Resumo SHAP - {selected_class}', height=25 * top_n)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.altair_chart(bars, use_container_width=True)
+    with col2:
+        st.altair_chart(summary, use_container_width=True)
+
+    # Dependência: valor da feature contra o valor SHAP dela na classe escolhida
+    selected_feature = st.selectbox('Feature para o gráfico de dependência', options=class_order + [c for c in artifact['columns'] if c not in class_order])
+    dependence = alt.Chart(frame[frame['Feature'] == selected_feature]).mark_circle(size=25, opacity=0.6).encode(
+        x=alt.X('Valor:Q', title=selected_feature),
+        y=alt.Y('SHAP:Q', title=f'Valor SHAP ({selected_class})'),
+        color=alt.Color('Classe real:N', sort=list(class_mapping.values())),
+        tooltip=[alt.Tooltip('Valor:Q', format='.3f'), alt.Tooltip('SHAP:Q', format='.4f'), 'Classe real']
+    ).properties(title=f'Dependência de {selected_feature}', height=350)
+    st.altair_chart(dependence, use_container_width=True)
+    n_background = artifact['meta'].get('n_background', 0)
+    metodo = (f'TreeSHAP interventional com {n_background} linhas de treino (amostra estratificada) como referência' if n_background
+              else 'TreeSHAP pelos caminhos das árvores (tree_path_dependent, sem amostra de referência)')
+    st.caption(f"Valores SHAP de {artifact['meta']['n_samples']} reviews de teste (amostra estratificada), gerados por notebooks/shap_artifacts.py. Método: {metodo}.")
+else:
+    st.info('Os valores SHAP ainda não foram gerados (python -m notebooks.shap_artifacts); exibindo as imagens estáticas.')
+
+    # Cria duas colunas
+    col1, col2 = st.columns(2)
 
-with col1:
-    image_0 = Image.open('data/outputs/SHAP_CLASS_0.png')
-    st.image(image_0, caption='Importância das Features na Classe 0 - Negativos', use_column_width=True)
+    with col1:
+        image_0 = Image.open('data/outputs/SHAP_CLASS_0.png')
+        st.image(image_0, caption='Importância das Features na Classe 0 - Negativos', use_column_width=True)
 
-with col2:
-    image_1 = Image.open('data/outputs/SHAP_CLASS_1.png')
-    st.image(image_1, caption='Importância das Features na Classe 1 - Neutros', use_column_width=True)
+    with col2:
+        image_1 = Image.open('data/outputs/SHAP_CLASS_1.png')
+        st.image(image_1, caption='Importância das Features na Classe 1 - Neutros', use_column_width=True)
 
-with col1:
-    image_2 = Image.open('data/outputs/SHAP_CLASS_2.png')
-    st.image(image_2, caption='Importância das Features na Classe 2 - Positivos', use_column_width=True)
+    with col1:
+        image_2 = Image.open('data/outputs/SHAP_CLASS_2.png')
+        st.image(image_2, caption='Importância das Features na Classe 2 - Positivos', use_column_width=True)
 
-with col2:
-    image_rf = Image.open('data/outputs/SHAP_BARRAS.png')
-    st.image(image_rf, caption='Gráfico de Barras Multiclasse', use_column_width=True)
+    with col2:
+        image_rf = Image.open('data/outputs/SHAP_BARRAS.png')
+        st.image(image_rf, caption='Gráfico de Barras Multiclasse', use_column_width=True)
 
 
 st.subheader('Conclusão e Próximos Passos')
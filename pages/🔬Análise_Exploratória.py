@@ -5,21 +5,30 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
 import altair as alt
-from scipy import stats
 import notebooks.tools as tools
-from scipy.stats import gaussian_kde
+import notebooks.data_catalog as data_catalog
+import notebooks.rollups as rollups
 plt.style.use('ggplot')
 
+# Os dados ficam uma única vez na memória do processo (Arrow) e são compartilhados entre sessões e reruns
+def load_data(name, columns=None, filters=None):
+    return data_catalog.shared_frame(name, columns=columns, filters=filters)
+
+# Agregados pré-calculados (rollups.py), recalculados só quando o dataset muda. A leitura fica em cache
+# pela impressão digital do cubo, então um rerun não confere nem relê o arquivo
 @st.cache_data
-def load_data(file_path):
-    return pd.read_parquet(file_path)
+def read_rollup(name, fingerprint):
+    return rollups.read_rollup(name)
 
-seed = 42
+def load_rollup(name):
+    return read_rollup(name, rollups.rollup_fingerprint(name))
 
-df = load_data('./data/outputs/eda_dataset.parquet')
+seed = 42
 
+# fingerprint: versão do eda_dataset, para o cache não servir a amostra e as correlações de dados antigos
 @st.cache_data
-def df_sampler(seed, df):
+def df_sampler(seed, fingerprint):
+    df = load_data('eda_dataset', columns=['payment_type', 'payment_value', 'price', 'freight_value', 'product_weight_g'])
     df_sample = df.sample(500, random_state=seed)
 
     df_sample['product_weight_g'] = df_sample['product_weight_g'].apply(lambda x: x/1000)
@@ -36,9 +45,6 @@ def df_sampler(seed, df):
 
     return df_sample
 
-df_summary = df.copy()
-df_summary.rename(columns=tools.translations, inplace=True)
-
 st.title("🔬Análise Exploratória")
 
 st.subheader("Olist E-Commerce Dataset")
@@ -50,50 +56,45 @@ st.subheader("Esquema do Dataset:")
 st.write("""Os dados estão divididos em vários conjuntos de dados para melhor compreensão e organização. Aqui está sua arquitetura:""")
 st.image("./project_assets/olist_dataset_schema.png")
 
-def resumirtabela(df):
-    resumo = pd.DataFrame(df.dtypes, columns=['dtypes'])
-    resumo = resumo.reset_index()
-    resumo['Nome'] = resumo['index']
-    resumo = resumo[['Nome', 'dtypes']]
-    resumo['Ausentes'] = df.isnull().sum().values
-    resumo['Únicos'] = df.nunique().values
-    resumo['Primeiro Valor'] = df.loc[0].values
-    resumo['Segundo Valor'] = df.loc[1].values
-    resumo['Terceiro Valor'] = df.loc[2].values
-
-    for name in resumo['Nome'].value_counts().index:
-        resumo.loc[resumo['Nome'] == name, 'Entropia'] = round(
-            stats.entropy(df[name].value_counts(normalize=True), base=2), 2)
-    return resumo
+# O resumo é calculado uma vez por versão do dataset, lendo uma coluna por vez (a tabela inteira
+# nunca fica na memória), e reaproveitado por todas as sessões
+@st.cache_data
+def resumir_dataset(fingerprint):
+    columns = [col for col in data_catalog.table_columns('eda_dataset') if not col.startswith('__index_level_')]
+    return pd.concat([tools.profile_dataframe(data_catalog.read_table('eda_dataset', columns=[col])) for col in columns],
+                     ignore_index=True)
+
+resumo = resumir_dataset(data_catalog.table_fingerprint('eda_dataset'))
 
 st.subheader("Resumo do Dataset")
 with st.expander("Clique aqui para ver o Resumo do Dataset", expanded=False):
-    st.dataframe(resumirtabela(df_summary))
+    resumo_colunas = ['Nome', 'Tipo', 'Ausentes', 'Únicos', 'Primeiro Valor', 'Segundo Valor', 'Terceiro Valor', 'Entropia']
+    st.dataframe(resumo[resumo_colunas].assign(Nome=resumo['Nome'].replace(tools.translations)).rename(columns={'Tipo': 'dtypes'}))
 
 id_cols = [
     'order_id', 'seller_id', 'customer_id', 'order_item_id',
       'product_id', 'review_id', 'customer_unique_id', 'seller_zip_code_prefix']
 
-cat_cols = df.nunique()[df.nunique() <= 27].keys().tolist()
+cat_cols = resumo.loc[resumo['Únicos'] <= 27, 'Nome'].tolist()
 
 num_cols = num_cols = ['review_score', 'payment_sequential', 'payment_installments',
                    'payment_value', 'price', 'freight_value', 'product_name_lenght',
                    'product_description_lenght', 'product_photos_qty', 'product_weight_g',
                    'product_length_cm', 'product_height_cm', 'product_width_cm']
 
-bin_cols = df.nunique()[df.nunique() == 2].keys().tolist()
+bin_cols = resumo.loc[resumo['Únicos'] == 2, 'Nome'].tolist()
 
 timestamp_cols = ['order_purchase_timestamp', 'order_approved_at', 'order_delivered_carrier_date', 
                   'order_estimated_delivery_date']
 
 @st.cache_data
-def calcular_correlacao(df):
-    corr = df[num_cols].corr()
+def calcular_correlacao(fingerprint):
+    corr = load_data('eda_dataset', columns=num_cols).corr()
     corr.rename(columns=tools.translations, inplace=True)
     corr.index = corr.index.map(tools.translations)
     return corr
 
-corr = calcular_correlacao(df)
+corr = calcular_correlacao(data_catalog.table_fingerprint('eda_dataset'))
 
 tab_correlacoes, tab_categorias, tab_valores_e_pagamentos, tab_clientes_e_vendedores, tab_datas_comerciais = st.tabs(['Correlações', 'Categorias', 'Valores e Pagamentos', 'Clientes e Vendedores', 'Datas Comerciais'])
 
@@ -144,11 +145,7 @@ with tab_correlacoes:
 
 with tab_categorias:
 
-    df_mean_score = df.copy()
-    df_mean_score.dropna(subset=['product_category_name'], inplace=True)
-
-    df_mean_score['product_category_name'] = df_mean_score['product_category_name'].apply(lambda x: x.replace('_', ' ').title())
-    avg_rating_best = df_mean_score.groupby('product_category_name')['review_score'].mean().reset_index()
+    avg_rating_best = load_rollup('category_review_score')
 
     top_categories_best = avg_rating_best.nlargest(14, 'review_score')
 
@@ -183,22 +180,20 @@ with tab_categorias:
     st.altair_chart(final_plot, use_container_width=True)
 
 with tab_valores_e_pagamentos:
-    df_sample = df_sampler(seed, df)
+    df_sample = df_sampler(seed, data_catalog.table_fingerprint('eda_dataset'))
 
 
     payment_types = df_sample['payment_type'].unique()
     selected_payment_types = st.multiselect('Selecione os Tipos de Pagamento', options=payment_types, default=payment_types.tolist())
 
-    if 'price_log' not in df.columns:
-        df['price_log'] = np.log(df['price'] + 1.5)
+    payment_counts = load_rollup('payment_type_counts')
+    payment_counts = payment_counts[payment_counts['payment_type'].isin(selected_payment_types)]
 
-    filtered_df = df[df['payment_type'].isin(selected_payment_types) & (df['payment_type'] != 'not_defined')]
-
-    count_chart = alt.Chart(filtered_df).mark_bar().encode(
+    count_chart = alt.Chart(payment_counts).mark_bar().encode(
         x=alt.X('payment_type:N', title='Tipos de Pagamento', axis=alt.Axis(labelAngle=0)),
-        y=alt.Y('count():Q', title='Contagem'),
+        y=alt.Y('count:Q', title='Contagem'),
         color='payment_type:N',
-        tooltip=['payment_type:N', alt.Tooltip('count():Q', title='Contagem')]
+        tooltip=['payment_type:N', alt.Tooltip('count:Q', title='Contagem')]
     ).properties(
         title='Distribuição dos Tipos de Pagamento',
         width='container',
@@ -209,19 +204,9 @@ with tab_valores_e_pagamentos:
         count_chart 
     ).resolve_scale(color='shared')
 
-
-    @st.cache_data
-    def calculate_density(data, column, group_column):
-        density_data = []
-        for group in data[group_column].unique():
-            subset = data[data[group_column] == group][column]
-            kde = gaussian_kde(subset)
-            x = np.linspace(subset.min(), subset.max(), 100)
-            y = kde(x)
-            density_data.append(pd.DataFrame({column: x, 'densidade': y, group_column: group}))
-        return pd.concat(density_data)
-
-    density_df = calculate_density(filtered_df, 'price_log', 'payment_type')
+    # A densidade de cada tipo de pagamento não depende dos demais, então basta filtrar o cubo
+    density_df = load_rollup('price_log_density')
+    density_df = density_df[density_df['payment_type'].isin(selected_payment_types)]
 
     chart = alt.Chart(density_df).mark_area(
         interpolate='basis',
@@ -246,9 +231,7 @@ with tab_valores_e_pagamentos:
         with col2:
             st.altair_chart(chart, use_container_width=True)
 
-    df_pairplot = df_sample.copy()
-
-    df_pairplot.rename(columns=tools.translations, inplace=True)
+    df_pairplot = df_sample.rename(columns=tools.translations)
 
     filtered_df = df_pairplot[df_pairplot['Tipo de Pagamento'].isin(selected_payment_types)]
 
@@ -289,10 +272,9 @@ with tab_clientes_e_vendedores:
 
     st.title('Distribuição dos Estados dos Clientes')
 
-    df_filtered = df[df['freight_value'] != -1]
-
-    count_data = df['customer_state'].value_counts().reset_index()
-    count_data.columns = ['customer_state', 'count']
+    count_data = load_rollup('customer_state_counts')
+    freight_data = load_rollup('freight_by_state')
+    freight_outliers = load_rollup('freight_outliers')
 
     count_chart = alt.Chart(count_data).mark_bar(size=20).encode(
         x=alt.X('customer_state:N', title='Estados', sort='-x'),
@@ -307,11 +289,25 @@ with tab_clientes_e_vendedores:
         labelAngle=-45
     )
 
-    box_chart = alt.Chart(df_filtered).mark_boxplot(size=25).encode(
+    # Boxplot desenhado a partir dos quartis pré-calculados, sem enviar as linhas ao navegador
+    box_base = alt.Chart(freight_data).encode(
         x=alt.X('customer_state:N', title='Estados', sort='-x'),
-        y=alt.Y('freight_value:Q', title='Valor do Frete', scale=alt.Scale(zero=False)),
-        color='customer_state:N',
-        tooltip=['customer_state:N', 'freight_value:Q']
+        color=alt.Color('customer_state:N', legend=None),
+        tooltip=['customer_state:N', 'lower:Q', 'q1:Q', 'median:Q', 'q3:Q', 'upper:Q']
+    )
+    box_chart = alt.layer(
+        box_base.mark_rule().encode(
+            y=alt.Y('lower:Q', title='Valor do Frete', scale=alt.Scale(zero=False)),
+            y2='upper:Q'
+        ),
+        box_base.mark_bar(size=25).encode(y='q1:Q', y2='q3:Q'),
+        box_base.mark_tick(size=25, color='white').encode(y='median:Q'),
+        alt.Chart(freight_outliers).mark_point(size=12).encode(
+            x=alt.X('customer_state:N', sort='-x'),
+            y='freight_value:Q',
+            color=alt.Color('customer_state:N', legend=None),
+            tooltip=['customer_state:N', 'freight_value:Q', 'count:Q']
+        )
     ).properties(
         title='Preço por Estado',
         width='container',
@@ -334,13 +330,10 @@ with tab_clientes_e_vendedores:
 
 with tab_datas_comerciais:
 
-    df_w_dates = load_data('./data/outputs/df_w_commercial_dates.parquet')
-
     st.title('Análise de Pedidos')
 
     # Gráfico de linha: Evolução dos Pedidos Totais
-    line_data =  df_w_dates['order_purchase_year_month'].value_counts().reset_index()
-    line_data.columns = ['year_month', 'count']
+    line_data = load_rollup('orders_per_year_month')
 
     line_chart = alt.Chart(line_data).mark_line(interpolate='linear', strokeWidth=2).encode(
         x=alt.X('year_month:O', title='Mês e Ano'),
@@ -356,12 +349,11 @@ with tab_datas_comerciais:
     st.altair_chart(line_chart, use_container_width=True)
 
     # Gráfico de histogramas: Pedidos Totais por Dia da Semana
-    weekday_data =  df_w_dates['order_purchase_dayofweek'].value_counts().reset_index()
-    weekday_data.columns = ['day_of_week', 'count']
+    weekday_data = load_rollup('orders_per_weekday')
 
     # Renomear dias da semana
     weekday_labels = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sab', 'Dom']
-    weekday_data['day_of_week'] = weekday_data['day_of_week'].apply(lambda x: weekday_labels[x])
+    weekday_data['day_of_week'] = np.array(weekday_labels)[weekday_data['day_of_week'].to_numpy()]
 
     histogram_weekday = alt.Chart(weekday_data).mark_bar().encode(
         x=alt.X('day_of_week:O', title='Dias', axis=alt.Axis(labelAngle=0)),
@@ -390,8 +382,7 @@ with tab_datas_comerciais:
 
 
     # Gráfico de histogramas: Total de pedidos por Período do Dia
-    time_period_data =  df_w_dates['order_purchase_time_day'].value_counts().reset_index()
-    time_period_data.columns = ['time_period', 'count']
+    time_period_data = load_rollup('orders_per_time_day')
 
     histogram_time_period = alt.Chart(time_period_data).mark_bar().encode(
         x=alt.X('time_period:O', title='Período do Dia', axis=alt.Axis(labelAngle=0)),
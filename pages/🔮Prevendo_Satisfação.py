@@ -1,75 +1,17 @@
 import streamlit as st
-import gzip
-import pickle
-import io
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.pipeline import Pipeline, FeatureUnion
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import FunctionTransformer
-from sklearn.base import BaseEstimator, TransformerMixin
-from LeIA import SentimentIntensityAnalyzer
-
-# Definição da função identity
-def identity(X):
-    return X
-
-# Definição da classe SentimentAnalyzer
-class SentimentAnalyzer(BaseEstimator, TransformerMixin):
-    def __init__(self):
-        self.analyzer = SentimentIntensityAnalyzer()
-    
-    def fit(self, X, y=None):
-        return self
-    
-    def transform(self, X):
-        compound_scores = []
-        neg_scores = []
-        pos_scores = []
-        neu_scores = []
-
-        for review in X:
-            s = self.analyzer.polarity_scores(review)
-            compound_scores.append(s['compound'])
-            neg_scores.append(s['neg'])
-            pos_scores.append(s['pos'])
-            neu_scores.append(s['neu'])
-        
-        return pd.DataFrame({
-            'comp_score': compound_scores,
-            'neg': neg_scores,
-            'pos': pos_scores,
-            'neu': neu_scores
-        })
-
-def create_pipeline():
-    features = FeatureUnion([
-        ('sentiment', Pipeline([
-            ('extract', FunctionTransformer(identity, validate=False)),
-            ('analyzer', SentimentAnalyzer())
-        ])),
-        ('tfidf', TfidfVectorizer(max_features=1000))
-    ])
-    
-    pipeline = Pipeline([
-        ('features', features),
-        ('clf', RandomForestClassifier(n_estimators=100, random_state=42))
-    ])
-    
-    return pipeline
-
-# Função para descompactar o modelo
-def decompress_model(compressed_path):
-    with gzip.open(compressed_path, 'rb') as f:
-        model_bytes = f.read()
-    return pickle.load(io.BytesIO(model_bytes))
-
-# Caminho para o arquivo compactado do modelo
-model_path = './notebooks/model_rf.pkl.gz'
-
-# Carregar o modelo descompactado
+import altair as alt
+import notebooks.model_registry as model_registry
+import notebooks.pipeline_timing as pipeline_timing
+# O model_rf.pkl.gz foi salvo em notebook e referencia __main__.SentimentAnalyzer e __main__.identity,
+# por isso os nomes continuam importados aqui
+from notebooks.sentiment import identity, SentimentAnalyzer, create_pipeline, set_store
+
+# Carregar o modelo (uma vez por processo; os reruns da página reutilizam o mesmo objeto)
 try:
-    model_rf = decompress_model(model_path)
+    # Comentários digitados na página não vão para a loja de sentimentos
+    model_rf = set_store(model_registry.load_model('satisfaction_rf'), False)
+    # Mede o tempo de cada etapa (TF-IDF, LeIA, floresta) em todas as previsões do processo
+    pipeline_timing.instrument(model_rf)
 except FileNotFoundError:
     st.error("Arquivo do modelo não encontrado. Verifique o caminho.")
 except Exception as e:
@@ -96,3 +38,21 @@ if st.button("Fazer Previsão"):
         st.markdown(f"## {category}")
     except Exception as e:
         st.error(f"Erro durante a previsão: {e}")
+
+with st.expander('Tempo por etapa', expanded=False):
+    st.dataframe(model_registry.load_stats(), hide_index=True)
+    st.dataframe(pipeline_timing.timings.summary().round(2), hide_index=True)
+
+    histogram = pipeline_timing.timings.histogram()
+    histogram = histogram[histogram['Chamadas'] > 0]
+    if not histogram.empty:
+        chart = alt.Chart(histogram).mark_bar().encode(
+            x=alt.X('Faixa:N', title='Tempo', sort=alt.SortField('Ordem')),
+            y=alt.Y('Chamadas:Q', title='Chamadas'),
+            color=alt.Color('Etapa:N', legend=None),
+            row=alt.Row('Etapa:N', title=None),
+            tooltip=['Etapa:N', 'Faixa:N', 'Chamadas:Q']
+        ).properties(
+            height=120
+        )
+        st.altair_chart(chart, use_container_width=True)
@@ -5,15 +5,14 @@ import matplotlib.pyplot as plt
 import altair as alt
 from math import ceil
 import numpy as np
-from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
-from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bouldin_score
-from yellowbrick.cluster import KElbowVisualizer, SilhouetteVisualizer
+import notebooks.data_catalog as data_catalog
+from notebooks.cluster import cluster_tools, sweep_artifacts
 
 # Função para carregar os dados
 @st.cache_data
-def load_data(file_path):
-    return pd.read_parquet(file_path)
+def load_data(name, columns=None, filters=None):
+    return data_catalog.read_table(name, columns=columns, filters=filters)
 
 # Função para aplicar a amostragem e escalonamento
 @st.cache_data
@@ -29,31 +28,17 @@ def process_data(df, formato_dados, sample_percentual, random_state=42):
 
     return df_sample
 
-# Função para calcular scores de clusters
+# Um KMeans por k (2 a 10) para o tratamento escolhido; cotovelo, silhueta e scores usam o mesmo resultado.
+# A silhueta é estimada com silhouette_sample vendas comparadas com todas as outras (custo linear no total de vendas)
+# e cada k roda em um processo, então o sweep leva perto do tempo do k mais lento
 @st.cache_data
-def calculate_cluster_scores(df_sample, k_range, score_types):
-    fitted_kmeans = {}
-    labels_kmeans = {}
-    df_scores = []
+def sweep_clusters(df_sample, k_max=10, silhouette_sample=5_000, random_state=42):
+    return cluster_tools.sweep_kmeans(df_sample, range(2, k_max + 1), random=random_state, silhouette_sample=silhouette_sample, n_jobs=-1)
 
-    for n_clusters in range(k_range[0], k_range[1] + 1):
-        tmp_scores = {"n_clusters": n_clusters}
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        labels_clusters = kmeans.fit_predict(df_sample)
-
-        fitted_kmeans[n_clusters] = kmeans
-        labels_kmeans[n_clusters] = labels_clusters
-
-        if "silhouette" in score_types:
-            tmp_scores["silhouette"] = silhouette_score(df_sample, labels_clusters)
-        if "calinski_harabasz" in score_types:
-            tmp_scores["calinski_harabasz"] = calinski_harabasz_score(df_sample, labels_clusters)
-        if "davies_bouldin" in score_types:
-            tmp_scores["davies_bouldin"] = davies_bouldin_score(df_sample, labels_clusters)
-
-        df_scores.append(tmp_scores)
-
-    return pd.DataFrame(df_scores).set_index("n_clusters")
+@st.cache_resource
+def load_sweeps(version):
+    # Recarrega só quando o arquivo gerado pelo sweep_artifacts muda (version = data de modificação)
+    return sweep_artifacts.load()
 
 st.title("Clusterização")
 st.markdown("""
@@ -68,49 +53,64 @@ Essa pagina conterá também o EDA realizado sobre esses clusters. As visoões s
 # Vizualição da escolha da formatação dos dados e do número de clusters
 st.subheader("Escolha do número de clusters e tratamento dos dados")
 st.markdown("""
-Como possuimos um quantitativo de mais de 80 mil vendas, utilizamos uma amostragem de 20% dos dados para aplicar os algoritmos de 
-            cotovelo, silhoueta, Calinski Harabasz e Davies Bouldin a procura do melhor número de clusters.
-Com essa amostragem de 20%, aplicamos os algortimos nos dados em sua forma original, depois os mesmos algortimos com os dados normalizados 
+Aplicamos os algoritmos de cotovelo, silhoueta, Calinski Harabasz e Davies Bouldin sobre todas as mais de 80 mil vendas a procura do melhor número de clusters. 
+            Como a silhueta exata compara cada venda com todas as outras, ela é estimada a partir de uma amostra de vendas sorteadas (comparadas com todas as vendas), 
+            com intervalo de confiança de 95%.
+Aplicamos os algortimos nos dados em sua forma original, depois os mesmos algortimos com os dados normalizados 
             e depois os mesmos algoritmos com os dados padronizados. Ao comparar os resultados obtidos, a clusterização dos dados normalizados
             em 3 clusters mostraram resultados mais satisfatorios.  
 """)
 
-# Carregar e processar os dados
-df = load_data("./data/cluster_data/category_seasonal_data.parquet")
 formato_dados = st.selectbox("Selecione o tratamento dos dados", ["original", "normalizado", "padronizado"])
 formato_dados = {"original": "original", "normalizado": "minmax", "padronizado": "standard"}[formato_dados]
 
-# Aplicar processamento de dados (com cache para eficiência)
-sample_percentual = 20
-df_sample = process_data(df, formato_dados, sample_percentual)
+# Os gráficos vêm do sweep pré-calculado (tratamentos x k); sem o arquivo, ou com um arquivo de outra versão
+# dos dados, o sweep roda aqui mesmo
+sweeps, sweep_meta = None, None
+if sweep_artifacts.SWEEP_PATH.exists():
+    sweeps, sweep_meta = load_sweeps(sweep_artifacts.SWEEP_PATH.stat().st_mtime_ns)
+    if sweep_meta.get("data_fingerprint") != data_catalog.table_fingerprint("category_seasonal_data"):
+        st.warning("O sweep pré-calculado é de outra versão do category_seasonal_data; calculando agora com os dados atuais "
+                   "(python -m notebooks.cluster.sweep_artifacts atualiza o arquivo).")
+        sweeps, sweep_meta = None, None
+else:
+    st.info("O sweep ainda não foi pré-calculado (python -m notebooks.cluster.sweep_artifacts); calculando agora.")
+
+if sweeps is not None:
+    sweep = sweeps[formato_dados]
+else:
+    df = load_data("category_seasonal_data")
+    sample_percentual = 100
+    df_sample = process_data(df, formato_dados, sample_percentual)
+    sweep = sweep_clusters(df_sample)
 
 # Divisão de interface em duas colunas
 col1, col2 = st.columns(2)
 
 # Gráfico de Elbow
 with col1:
-    k_range = st.slider("Selecione o intervalo de clusters", min_value=2, max_value=10, value=(2, 7))
+    k_range = st.slider("Selecione o intervalo de clusters", min_value=sweep.ks[0], max_value=sweep.ks[-1], value=(sweep.ks[0], min(7, sweep.ks[-1])))
+    k_values = list(range(k_range[0], k_range[1] + 1))
     plt.figure()
-    km = KMeans(random_state=42)
-    visualizer = KElbowVisualizer(km, k=(k_range[0], k_range[1]))
-    visualizer.fit(df_sample)
+    sweep.plot_elbow(k_values)
     st.pyplot(plt.gcf())
 
 # Gráfico de Silhouette
 with col2:
-    k_silhouette = st.slider("Selecione o número de clusters", min_value=2, max_value=10, value=3)
+    k_silhouette = st.slider("Selecione o número de clusters", min_value=sweep.ks[0], max_value=sweep.ks[-1], value=3)
     plt.figure()
-    km = KMeans(n_clusters=k_silhouette, random_state=42)
-    visualizer = SilhouetteVisualizer(km, colors='yellowbrick')
-    visualizer.fit(df_sample)
+    sweep.plot_silhouette(k_silhouette)
     st.pyplot(plt.gcf())
 
 # Expandir para exibir as métricas de avaliação
 with st.expander("Silhueta, Calinski Harabasz e Davies Bouldin", expanded=False):
-    score_types = ["silhouette", "calinski_harabasz", "davies_bouldin"]
-    df_scores = calculate_cluster_scores(df_sample, k_range, score_types)
-    df_scores.plot(subplots=True, layout=(1, len(score_types)), figsize=(len(score_types) * 6, 5))
+    sweep.plot_scores(cluster_tools.SCORE_TYPES, k_values, width_per_ax=6)
     st.pyplot(plt.gcf())
+    st.caption(f"Tempo de cada k em segundos (sweep completo em {sweep.wall_time:.1f}s)")
+    st.dataframe(sweep.timings(k_values).round(2))
+    if sweep_meta is not None:
+        silhouette_rows = f"{sweep_meta['silhouette_sample']} vendas sorteadas" if sweep_meta["silhouette_sample"] else "todas as vendas"
+        st.caption(f"Sweep de {sweep_meta['n_rows']} vendas (silhueta de {silhouette_rows}), gerado por notebooks/cluster/sweep_artifacts.py.")
 st.subheader("EDA dos clusters obtidos")
 st.markdown("""
 Aqui, é possivel visualizar as caracteristicas de cada clustar referente a dimensão escolhida.
@@ -119,7 +119,7 @@ Aqui, é possivel visualizar as caracteristicas de cada clustar referente a dime
 tab_categorias, tab_datas_comerciais, tab_valor_venda, tab_vendas_mensais = st.tabs(['Categorias', 'Datas Comerciais', 'Valor de venda', 'Venda por mês'])
 
 with tab_categorias:
-    dados_agrupados = load_data("./data/cluster_data/df_grouped_category_per_cluster.parquet")
+    dados_agrupados = load_data("df_grouped_category_per_cluster")
 
     with st.expander("Clique aqui os dados em um gráfico unico", expanded=False):
         plt.figure(figsize=(10, 4))
@@ -157,7 +157,7 @@ with tab_categorias:
         st.write("Nenhuma categoria selecionada.")
 
 with tab_datas_comerciais:
-    dados_feriados = load_data("./data/cluster_data/df_grouped_commercialdate_per_cluster.parquet")
+    dados_feriados = load_data("df_grouped_commercialdate_per_cluster")
 
     with st.expander("Clique aqui os dados em um gráfico unico", expanded=False):
         plt.figure(figsize=(10, 4))
@@ -195,7 +195,7 @@ with tab_datas_comerciais:
         st.write("Nenhuma categoria selecionada.")
 
 with tab_valor_venda:
-    gasto_medio = load_data("./data/cluster_data/avg_spending.parquet")
+    gasto_medio = load_data("avg_spending")
 
     st.subheader("Filtragem da quantidade de compras por datas comerciais por cluster")
     clusters_3 = dados_feriados['hue'].unique()
@@ -229,9 +229,9 @@ with tab_valor_venda:
     st.altair_chart(final_heatmap, use_container_width=True)
 
 with tab_vendas_mensais:
-    sales_price_per_cluster = load_data("./data/cluster_data/sales_price_per_cluster.parquet")
-    sales_price_volume = load_data("./data/cluster_data/sales_price_volume.parquet")
-    sales_volume_per_cluster = load_data("./data/cluster_data/sales_volume_per_cluster.parquet")
+    sales_price_per_cluster = load_data("sales_price_per_cluster")
+    sales_price_volume = load_data("sales_price_volume")
+    sales_volume_per_cluster = load_data("sales_volume_per_cluster")
 
     plt.figure(figsize=(12, 4))
     sns.lineplot(data=sales_volume_per_cluster, x='month', y='sales_volume', hue='hue', marker='o')
@@ -12,6 +12,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import re
 import warnings 
+import notebooks.tools as tools
 
 #Funções
 
@@ -22,17 +23,17 @@ file_path = './data/olist_order_reviews_dataset.parquet'
 df = load_data(file_path)
 
 def skimming_data(data):
+    profile, duplicates = tools.profile_with_duplicates(data)
     skimmed_data = pd.DataFrame({
-        'feature': data.columns.values,  
-        'data_type': data.dtypes.values,  
-        'null_value(%)': data.isna().mean().values * 100,  
-        'neg_value(%)': [len(data[col][data[col] < 0]) / len(data) * 100 if col in data.select_dtypes(include=[np.number]).columns else 0 for col in data.columns], 
-        '0_value(%)': [len(data[col][data[col] == 0]) / len(data) * 100 if col in data.select_dtypes(include=[np.number]).columns else 0 for col in data.columns], 
-        'duplicate': data.duplicated().sum(),  
-        'n_unique': data.nunique().values, 
-        #'sample_unique': [', '.join(map(str, data[col].unique())) for col in data.columns] 
+        'feature': data.columns.values,
+        'data_type': data.dtypes.values,
+        'null_value(%)': profile['Ausentes (%)'],
+        'neg_value(%)': profile['Negativos (%)'],
+        '0_value(%)': profile['Zeros (%)'],
+        'duplicate': duplicates,
+        'n_unique': profile['Únicos'],
     })
-    
+
     return skimmed_data.round(3)
 
 
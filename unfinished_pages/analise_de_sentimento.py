@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import notebooks.sentiment_store as sentiment_store
 
 def load_data(file_path):
     return pd.read_parquet(file_path)
@@ -93,20 +93,20 @@ st.pyplot(plt)
 
 #Análise de Sentimento
 st.title('Análise de Sentimento')
-analyzer = SentimentIntensityAnalyzer()
+# Cada comentário é pontuado pelo VADER uma única vez; as próximas visitas leem os scores do disco
+orders_reviews['compound'] = sentiment_store.get_store('vader').scores(orders_reviews['review_comment_message'])[:, 0]
 
-def analyze_sentiment(comment):
-    if pd.isna(comment):
+def analyze_sentiment(compound):
+    if pd.isna(compound):
         return None
-    score = analyzer.polarity_scores(comment)
-    if score['compound'] >= 0.1:
+    if compound >= 0.1:
         return 'Positivo'
-    elif score['compound'] <= -0.1:
+    elif compound <= -0.1:
         return 'Negativo'
     else:
         return 'Neutro'
 
-orders_reviews['Sentimento'] = orders_reviews['review_comment_message'].apply(analyze_sentiment)
+orders_reviews['Sentimento'] = orders_reviews['compound'].apply(analyze_sentiment)
 
 # porcentagem de sentimentos
 sentiment_distribution = orders_reviews['Sentimento'].value_counts(normalize=True) * 100
@@ -115,7 +115,7 @@ st.write(sentiment_distribution)
 
 # plot da distribuição dos escores 'compound'
 plt.figure(figsize=(20, 5), dpi=500)
-sns.histplot(orders_reviews['review_comment_message'].dropna().apply(lambda x: analyzer.polarity_scores(x)['compound']), bins=30, kde=True)
+sns.histplot(orders_reviews['compound'].dropna(), bins=30, kde=True)
 plt.title('Distribuição das notas/compound dos comentários', fontsize = 16)
 plt.xlabel('Score Compound', fontsize= 14)
 plt.ylabel('Frequência', fontsize = 14)
@@ -125,7 +125,7 @@ st.pyplot(plt)
 #st.subheader('Top 3 Comentários mais Positivos e Negativos baseados no Score Compound')
 
 # Ordenar os comentários pelos escores 'compound'
-#orders_reviews['compound'] = orders_reviews['review_comment_message'].apply(lambda x: analyzer.polarity_scores(str(x))['compound'] if pd.notna(x) else None)
+# (orders_reviews['compound'] já vem da loja de sentimentos)
 
 #st.subheader('Comentários Mais Positivos:')
 #top_positive_comments = orders_reviews.sort_values(by='compound', ascending=False).head(3)
@@ -1,30 +1,14 @@
 import pandas as pd
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-import string
 from sklearn.feature_extraction.text import CountVectorizer
 import streamlit as st
+import notebooks.data_catalog as data_catalog
+import notebooks.text_normalization as text_normalization
 
-def load_data(file_path):
-    return pd.read_parquet(file_path)
-
-def preprocess_text(text):
-    if text is None:
-        return ''
-    lemmatizer = WordNetLemmatizer()
-    stop_words = set(stopwords.words('portuguese'))
-    text = text.lower()
-    text = text.translate(str.maketrans('', '', string.punctuation))
-    tokens = word_tokenize(text, language='portuguese')
-    tokens = [lemmatizer.lemmatize(word) for word in tokens if word not in stop_words]
-    return ' '.join(tokens)
-
-def download_nltk_resources():
-    nltk.download('punkt')
-    nltk.download('stopwords')
-    nltk.download('wordnet')
+# A normalização roda fora da página, em lote (python -m notebooks.text_normalization); aqui a tabela
+# gerada só é lida (version = data de modificação do arquivo)
+@st.cache_data
+def load_data(version):
+    return data_catalog.read_table('order_reviews_normalized')
 
 def get_top_keywords(texts, num_keywords=10):
     vectorizer = CountVectorizer()
@@ -54,13 +38,16 @@ def categorize_review(text):
 
 st.title('Análise de Reviews')
 
-file_path = './data/olist_order_reviews_dataset.parquet'
-df = load_data(file_path)
-download_nltk_resources()
+normalized_path = data_catalog.table_path('order_reviews_normalized')
+if not normalized_path.exists():
+    st.warning('As reviews ainda não foram normalizadas. Rode python -m notebooks.text_normalization para gerar a tabela.')
+    st.stop()
+if text_normalization.is_stale():
+    st.warning('A tabela normalizada é de outra versão das reviews; python -m notebooks.text_normalization atualiza o arquivo.')
+df = load_data(normalized_path.stat().st_mtime_ns)
 
 if 'review_comment_message' in df.columns and 'review_score' in df.columns:
     df['review_comment_message'] = df['review_comment_message'].fillna('')
-    df['processed_review'] = df['review_comment_message'].apply(preprocess_text)
     df['category'] = df['processed_review'].apply(categorize_review)
 
     selected_category = st.selectbox(